@@ -0,0 +1,77 @@
+# This module contains compiled geometry kernels used by layout_analysis.py.
+# The kernels are JIT-compiled with Numba when it is installed; callers should
+# check NUMBA_AVAILABLE and fall back to the NumPy implementations otherwise.
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError: # Numba is optional
+    NUMBA_AVAILABLE = False
+
+
+def _assign_and_filter_loops(boxes_aa, cols, spanning, thresh=0.7):
+    """
+    For every axis-aligned box, decides in a single pass whether it is subsumed by a
+    spanning row and which column it belongs to.
+    Spanning rows are sorted by their top edge, so each box only tests the rows that start
+    above its bottom edge, and rows whose bounding box misses the box are rejected before
+    computing the overlap ratio.
+
+    Args:
+        boxes_aa (np.ndarray): (N, 4) float64 boxes [xmin, ymin, xmax, ymax] with positive areas.
+        cols (np.ndarray): (C, 2) float64 columns [col_xmin, col_xmax].
+        spanning (np.ndarray): (S, 4) float64 spanning rows [xmin, ymin, xmax, ymax].
+        thresh (float): A box is subsumed if more than this fraction of its area is
+                        inside a single spanning row.
+
+    Returns:
+        tuple: (best, subsumed)
+               - best: (N,) int64 column index of each box (largest horizontal overlap,
+                 which must be > 50% of the box width), or -1 if none.
+               - subsumed: (N,) boolean mask of boxes subsumed by a spanning row.
+    """
+    num_boxes, num_cols, num_spanning = boxes_aa.shape[0], cols.shape[0], spanning.shape[0]
+    spanning = spanning[np.argsort(spanning[:, 1])] # Sorted by ymin
+    best = np.full(num_boxes, -1, np.int64)
+    subsumed = np.zeros(num_boxes, np.bool_)
+
+    for i in range(num_boxes):
+        bx1, by1, bx2, by2 = boxes_aa[i, 0], boxes_aa[i, 1], boxes_aa[i, 2], boxes_aa[i, 3]
+        box_width = bx2 - bx1
+        box_area = box_width * (by2 - by1)
+
+        for s in range(num_spanning):
+            if spanning[s, 1] >= by2: # This and all later rows start below the box
+                break
+            if spanning[s, 3] <= by1 or spanning[s, 2] <= bx1 or spanning[s, 0] >= bx2:
+                continue # Bounding boxes do not intersect
+            overlap_width = min(bx2, spanning[s, 2]) - max(bx1, spanning[s, 0])
+            overlap_height = min(by2, spanning[s, 3]) - max(by1, spanning[s, 1])
+            if overlap_width * overlap_height / box_area > thresh:
+                subsumed[i] = True
+                break
+
+        if box_width <= 1e-6: # Cannot assign zero-width box by overlap ratio
+            continue
+        best_col = -1
+        best_overlap = -np.inf
+        for c in range(num_cols):
+            overlap_width = min(bx2, cols[c, 1]) - max(bx1, cols[c, 0])
+            if overlap_width > best_overlap: # First column wins on ties
+                best_overlap = overlap_width
+                best_col = c
+        if best_overlap > 0 and best_overlap / box_width > 0.5:
+            best[i] = best_col
+
+    return best, subsumed
+
+
+if NUMBA_AVAILABLE:
+    # Serial and GIL-free: pages are processed in parallel by threads (process_document_layout_batch),
+    # and Numba's parallel kernels must not be launched from several threads at once
+    assign_and_filter = njit(cache=True, nogil=True)(_assign_and_filter_loops)
+else:
+    assign_and_filter = _assign_and_filter_loops
+
@@ -4,8 +4,14 @@
 # spanning elements from single-column elements.
 
 import math
+import operator
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import numpy as np
 
+from _geom_kernels import NUMBA_AVAILABLE, assign_and_filter
+
 # --- Core Helper Functions for Bounding Box Manipulation ---
 
 def convert_to_axis_aligned(poly_box):
@@ -27,6 +33,35 @@ def convert_to_axis_aligned(poly_box):
         return None
     return [min(x_coords), min(y_coords), max(x_coords), max(y_coords)]
 
+def convert_polygons_to_axis_aligned(poly_boxes):
+    """
+    Batched version of `convert_to_axis_aligned`: converts N 4-point polygon boxes
+    to an (N, 4) float array of [xmin, ymin, xmax, ymax] rows in one NumPy reduction.
+    Polygons may be given as nested lists/tuples or as an (N, 4, 2) array.
+    Invalid polygons produce a row of NaNs, so row i always matches polygon i.
+    """
+    try:
+        polys = np.asarray(poly_boxes, dtype=np.float64)
+    except (ValueError, TypeError):
+        polys = None # Ragged or non-numeric input, convert box by box below
+
+    if polys is None or polys.ndim != 3 or polys.shape[1:] != (4, 2):
+        if polys is not None and polys.size == 0:
+            return np.empty((0, 4), dtype=np.float64)
+        aa_rows = []
+        for poly_box in poly_boxes:
+            try:
+                poly_np = np.asarray(poly_box, dtype=np.float64)
+            except (ValueError, TypeError):
+                poly_np = None
+            if poly_np is None or poly_np.shape != (4, 2):
+                aa_rows.append([np.nan] * 4)
+            else:
+                aa_rows.append(np.concatenate([poly_np.min(axis=0), poly_np.max(axis=0)]))
+        return np.array(aa_rows, dtype=np.float64).reshape(-1, 4)
+
+    return np.concatenate([polys.min(axis=1), polys.max(axis=1)], axis=1)
+
 def expand_box_horizontally(box, expansion_factor_each_side):
     """
     Expands an axis-aligned box [xmin, ymin, xmax, ymax] horizontally on both sides.
@@ -95,28 +130,42 @@ def create_rows_from_boxes(
     Returns:
         list: A list of merged AA boxes [xmin, ymin, xmax, ymax] representing the formed rows.
     """
-    if not initial_polygon_boxes:
+    if len(initial_polygon_boxes) == 0:
         return []
-    
-    # Convert to AA and filter out invalid or zero-area boxes
-    axis_aligned_boxes = []
-    for poly_box in initial_polygon_boxes:
-        aa_box = convert_to_axis_aligned(poly_box)
-        # Ensure the box has positive width and height (greater than a small epsilon)
-        if aa_box and (aa_box[2] - aa_box[0] > 1e-6) and \
-           (aa_box[3] - aa_box[1] > 1e-6):
-            axis_aligned_boxes.append(aa_box)
-            
-    if not axis_aligned_boxes:
+    return _merge_aa_boxes_into_rows(
+        convert_polygons_to_axis_aligned(initial_polygon_boxes),
+        horizontal_expansion_factor_each_side,
+        vertical_overlap_threshold_ratio
+    )
+
+def _merge_aa_boxes_into_rows(aa_boxes, horizontal_expansion_factor_each_side,
+                              vertical_overlap_threshold_ratio):
+    """
+    Row-merging core of `create_rows_from_boxes`, working on an (N, 4) array of
+    already converted AA boxes (NaN rows for invalid polygons are allowed).
+    """
+    # Filter out invalid or zero-area boxes: ensure the box has positive width and
+    # height (greater than a small epsilon). NaN rows fail both comparisons.
+    valid = ((aa_boxes[:, 2] - aa_boxes[:, 0]) > 1e-6) & ((aa_boxes[:, 3] - aa_boxes[:, 1]) > 1e-6)
+    if not valid.any():
         return []
 
+    # Work on the coordinates as separate arrays (one per box edge)
+    boxes_np = aa_boxes[valid]
+    x0, y0, x1, y1 = boxes_np[:, 0], boxes_np[:, 1], boxes_np[:, 2], boxes_np[:, 3]
+
     # Expand boxes horizontally to encourage merging of nearby words into a line
-    extended_boxes = [expand_box_horizontally(b, horizontal_expansion_factor_each_side) for b in axis_aligned_boxes]
-    
+    # (same as expand_box_horizontally, applied to all boxes at once)
+    extension = (x1 - x0) * horizontal_expansion_factor_each_side
+    x0, x1 = x0 - extension, x1 + extension
+
     # Sort boxes primarily by y_min (top coordinate), then by x_min (left coordinate)
     # This helps process boxes in a top-to-bottom, left-to-right reading order.
-    sorted_boxes = sorted(extended_boxes, key=lambda b: (b[1], b[0]))
-    
+    # np.lexsort uses the last key as the primary one and is stable, like sorted().
+    order = np.lexsort((x0, y0))
+    x0, y0, x1, y1 = x0[order], y0[order], x1[order], y1[order]
+    sorted_boxes = np.column_stack((x0, y0, x1, y1)).tolist()
+
     final_rows_aa = []
     if not sorted_boxes: # Should not happen if axis_aligned_boxes was populated
         return []
@@ -153,21 +202,65 @@ def get_page_extents(all_axis_aligned_boxes):
     Calculates the overall bounding box (min/max x and y coordinates)
     that encompasses all provided axis-aligned boxes.
     """
-    if not all_axis_aligned_boxes:
+    if len(all_axis_aligned_boxes) == 0:
         return 0, 0, 0, 0 # Default if no boxes
     
-    all_x_coords = [b[0] for b in all_axis_aligned_boxes] + [b[2] for b in all_axis_aligned_boxes]
-    all_y_coords = [b[1] for b in all_axis_aligned_boxes] + [b[3] for b in all_axis_aligned_boxes]
-    
-    if not all_x_coords: # Should not happen if all_axis_aligned_boxes is not empty
-        return 0, 0, 0, 0
+    boxes_np = np.asarray(all_axis_aligned_boxes, dtype=np.float64).reshape(-1, 4)
+    all_x_coords = boxes_np[:, 0::2] # xmin and xmax columns
+    all_y_coords = boxes_np[:, 1::2] # ymin and ymax columns
+
+    return (float(all_x_coords.min()), float(all_x_coords.max()),
+            float(all_y_coords.min()), float(all_y_coords.max()))
 
-    return min(all_x_coords), max(all_x_coords), min(all_y_coords), max(all_y_coords)
+def column_bounds_to_arrays(columns):
+    """
+    Splits a list of (col_xmin, col_xmax) tuples into two contiguous 1-D arrays
+    (col_starts, col_ends), so they can be built once per page and reused.
+    """
+    if not columns:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64)
+    col_starts = np.asarray([c[0] for c in columns], dtype=np.float64)
+    col_ends = np.asarray([c[1] for c in columns], dtype=np.float64)
+    return col_starts, col_ends
+
+def assign_boxes_to_columns(boxes_aa_array, col_starts, col_ends):
+    """
+    Vectorized column assignment for many axis-aligned boxes at once.
+    Each box is assigned to the column it overlaps the most horizontally, provided
+    that overlap is more than 50% of the box's own width.
+
+    Args:
+        boxes_aa_array (array-like): (N, 4) boxes [xmin, ymin, xmax, ymax].
+        col_starts (np.ndarray): (K,) column x_min values.
+        col_ends (np.ndarray): (K,) column x_max values.
+
+    Returns:
+        np.ndarray: (N,) array of assigned column indices, -1 where no suitable column.
+    """
+    boxes = np.asarray(boxes_aa_array, dtype=np.float64).reshape(-1, 4)
+    num_boxes = boxes.shape[0]
+    assigned = np.full(num_boxes, -1, dtype=np.intp)
+    if num_boxes == 0 or len(col_starts) == 0:
+        return assigned
+
+    box_widths = boxes[:, 2] - boxes[:, 0]
+    # (N, K) matrix of horizontal overlap widths between every box and every column
+    overlap_widths = np.minimum(boxes[:, 2:3], col_ends) - np.maximum(boxes[:, 0:1], col_starts)
+    best_col = overlap_widths.argmax(axis=1) # First column wins on ties
+    best_overlap = overlap_widths[np.arange(num_boxes), best_col]
+
+    # Box must overlap > 50% of its own width with the column to be confidently assigned
+    valid_width = box_widths > 1e-6 # Cannot assign zero-width box by overlap ratio
+    overlap_ratio = np.divide(best_overlap, box_widths, out=np.zeros(num_boxes), where=valid_width)
+    valid = valid_width & (best_overlap > 0) & (overlap_ratio > 0.5)
+    assigned[valid] = best_col[valid]
+    return assigned
 
 def assign_box_to_column_by_overlap(box_aa, columns):
     """
     Assigns an axis-aligned box to a column based on maximum horizontal overlap.
     The box must overlap with the assigned column by more than 50% of its own width.
+    Thin wrapper around `assign_boxes_to_columns` for a single box.
 
     Args:
         box_aa ([xmin, ymin, xmax, ymax]): The axis-aligned box to assign.
@@ -177,31 +270,99 @@ def assign_box_to_column_by_overlap(box_aa, columns):
         int or None: Index of the assigned column, or None if no suitable assignment.
     """
     if not columns or not box_aa: return None
-    
-    max_overlap_width = -1.0 # Start with negative to ensure any positive overlap is chosen
-    assigned_col_idx = None
-    box_width = box_aa[2] - box_aa[0]
-    
-    if box_width <= 1e-6: return None # Cannot assign zero-width box by overlap ratio
 
-    for i, (col_xmin, col_xmax) in enumerate(columns):
-        overlap_start = max(box_aa[0], col_xmin)
-        overlap_end = min(box_aa[2], col_xmax)
-        overlap_width = overlap_end - overlap_start
-        
-        if overlap_width > max_overlap_width:
-            max_overlap_width = overlap_width
-            assigned_col_idx = i
-            
-    # Ensure a significant part of the box overlaps with the assigned column
-    if assigned_col_idx is not None and max_overlap_width > 0:
-        # Box must overlap > 50% of its own width with the column to be confidently assigned
-        if (max_overlap_width / box_width) > 0.5: 
-            return assigned_col_idx
-    return None
+    col_starts, col_ends = column_bounds_to_arrays(columns)
+    assigned_col_idx = assign_boxes_to_columns([box_aa], col_starts, col_ends)[0]
+    return int(assigned_col_idx) if assigned_col_idx >= 0 else None
+
+
+def count_columns_touched(rows_aa, col_starts, col_ends):
+    """
+    Counts, for every axis-aligned row, how many columns it horizontally overlaps
+    (max of starts < min of ends).
+
+    For the usual case of sorted, non-overlapping columns this is an interval sweep:
+    the touched columns form one contiguous run, found with two binary searches per
+    row (O(R log C), no (R, C) matrix). Other column sets fall back to a broadcast test.
+
+    Args:
+        rows_aa (np.ndarray): (R, 4) rows [xmin, ymin, xmax, ymax].
+        col_starts, col_ends (np.ndarray): (C,) column bounds.
+
+    Returns:
+        np.ndarray: (R,) number of columns touched by each row.
+    """
+    order = np.argsort(col_starts, kind='stable')
+    sorted_starts, sorted_ends = col_starts[order], col_ends[order]
+    columns_are_disjoint = np.all(sorted_starts < sorted_ends) and \
+                           np.all(sorted_ends[:-1] <= sorted_starts[1:])
+    if not columns_are_disjoint:
+        touches_col = np.maximum(rows_aa[:, 0:1], col_starts) < np.minimum(rows_aa[:, 2:3], col_ends)
+        return touches_col.sum(axis=1)
+
+    # First column ending after the row starts, and first column starting at/after the row ends
+    first_touched = np.searchsorted(sorted_ends, rows_aa[:, 0], side='right')
+    after_last_touched = np.searchsorted(sorted_starts, rows_aa[:, 2], side='left')
+    # Zero-width rows cannot overlap anything; multiplied out rather than masked
+    return np.clip(after_last_touched - first_touched, 0, None) * (rows_aa[:, 2] > rows_aa[:, 0])
+
+def find_boxes_subsumed_by_rows(boxes_aa, box_areas, rows_aa, min_overlap_ratio=0.7):
+    """
+    Flags boxes whose area lies mostly (> min_overlap_ratio) inside any of the given rows.
+
+    Rows are swept in order of their top edge: for each box, only the rows whose
+    vertical extent can intersect it are located (two binary searches) and tested,
+    so the work is close to linear in the number of boxes rather than N * S.
+
+    Args:
+        boxes_aa (np.ndarray): (N, 4) boxes [xmin, ymin, xmax, ymax] with positive areas.
+        box_areas (np.ndarray): (N,) areas of `boxes_aa`.
+        rows_aa (np.ndarray): (S, 4) rows [xmin, ymin, xmax, ymax].
+        min_overlap_ratio (float): Fraction of a box's area that must be covered by one row.
+
+    Returns:
+        np.ndarray: (N,) boolean mask, True where the box is subsumed by some row.
+    """
+    num_boxes = boxes_aa.shape[0]
+    is_subsumed = np.zeros(num_boxes, dtype=bool)
+    if num_boxes == 0 or rows_aa.shape[0] == 0:
+        return is_subsumed
+
+    rows_sorted = rows_aa[np.argsort(rows_aa[:, 1], kind='stable')]
+    # Rows [0, last) start above the box bottom; rows before `first` all end above the box
+    # top (running max of row bottoms is monotonic, so it can be binary searched too)
+    running_row_bottom = np.maximum.accumulate(rows_sorted[:, 3])
+    first = np.searchsorted(running_row_bottom, boxes_aa[:, 1], side='right')
+    last = np.searchsorted(rows_sorted[:, 1], boxes_aa[:, 3], side='left')
+    candidate_counts = np.maximum(last - first, 0)
+    if not candidate_counts.any():
+        return is_subsumed
+
+    # Expand the candidate windows into flat (box, row) pairs
+    pair_box = np.repeat(np.arange(num_boxes), candidate_counts)
+    window_offsets = np.cumsum(candidate_counts) - candidate_counts
+    pair_row = first[pair_box] + (np.arange(pair_box.size) - window_offsets[pair_box])
+
+    boxes_p, rows_p = boxes_aa[pair_box], rows_sorted[pair_row]
+    overlap_widths = np.clip(np.minimum(boxes_p[:, 2], rows_p[:, 2]) - np.maximum(boxes_p[:, 0], rows_p[:, 0]), 0, None)
+    overlap_heights = np.clip(np.minimum(boxes_p[:, 3], rows_p[:, 3]) - np.maximum(boxes_p[:, 1], rows_p[:, 1]), 0, None)
+    pair_is_subsumed = overlap_widths * overlap_heights / box_areas[pair_box] > min_overlap_ratio
+    is_subsumed[pair_box[pair_is_subsumed]] = True
+    return is_subsumed
 
 
 # --- Column Identification Methods ---
+@lru_cache(maxsize=16)
+def _smoothing_kernel(smooth_window):
+    """
+    Returns the (read-only) moving-average kernel of the given window size.
+    Cached so that repeated calls with the same window (e.g. every page of a
+    document) reuse the same array instead of rebuilding it.
+    """
+    kernel = np.ones(smooth_window) / smooth_window
+    kernel.setflags(write=False) # Shared between calls, so guard against mutation
+    return kernel
+
 def identify_columns_simple(all_axis_aligned_boxes, page_min_x, page_max_x,
                             smooth_window=5, gap_threshold_factor=0.05, 
                             min_col_width_heuristic=30):
@@ -239,14 +400,16 @@ def identify_columns_simple(all_axis_aligned_boxes, page_min_x, page_max_x,
         if start_idx < end_idx : # Ensure valid range
             projection[start_idx:end_idx] += 1
     
-    if np.sum(projection) == 0: # No text projected
+    # Counts are non-negative, so an all-zero profile means no text was projected.
+    # Checked before smoothing so degenerate pages skip the convolution entirely.
+    if not projection.any():
         return [(page_min_x, page_max_x)] if all_axis_aligned_boxes else []
 
     # Smooth the projection profile to reduce noise
     projection_smooth = projection
     if smooth_window > 1 and smooth_window < len(projection):
         try:
-            projection_smooth = np.convolve(projection, np.ones(smooth_window)/smooth_window, mode='same')
+            projection_smooth = np.convolve(projection, _smoothing_kernel(smooth_window), mode='same')
         except ValueError: # Can happen if smooth_window is too large for a small projection
             projection_smooth = projection # Use unsmoothed if convolution fails
             
@@ -287,33 +450,70 @@ def identify_columns_simple(all_axis_aligned_boxes, page_min_x, page_max_x,
     
     # Post-process: Merge very close or slightly overlapping columns
     if len(columns) > 1:
-        columns.sort(key=lambda c: c[0]) # Ensure sorted by x_min
-        merged_cols = [list(columns[0])]
-        for i in range(1, len(columns)):
-            prev_col_xmin, prev_col_xmax = merged_cols[-1]
-            curr_col_xmin, curr_col_xmax = columns[i]
-            # If current column starts before or very close to where previous one ended, merge them
-            # Allow a small gap (quarter of min_col_width_heuristic) for merging
-            if curr_col_xmin < prev_col_xmax + (min_col_width_heuristic / 4.0): 
-                merged_cols[-1][1] = max(prev_col_xmax, curr_col_xmax) # Extend current merged column
-            else:
-                merged_cols.append(list(columns[i]))
+        cols_np = np.asarray(columns)
+        cols_np = cols_np[np.argsort(cols_np[:, 0], kind='stable')] # Ensure sorted by x_min
+        # A column starts a new group unless it begins before, or very close to, the furthest
+        # end seen so far. Allow a small gap (quarter of min_col_width_heuristic) for merging.
+        running_col_end = np.maximum.accumulate(cols_np[:, 1])
+        break_mask = cols_np[1:, 0] >= running_col_end[:-1] + (min_col_width_heuristic / 4.0)
+        group_starts = np.flatnonzero(np.concatenate(([True], break_mask)))
+        merged_cols = np.column_stack((
+            np.minimum.reduceat(cols_np[:, 0], group_starts),
+            np.maximum.reduceat(cols_np[:, 1], group_starts)
+        ))
         # Ensure merged columns are still wide enough
-        columns = [tuple(c) for c in merged_cols if (c[1]-c[0]) >= min_col_width_heuristic] 
+        wide_enough = (merged_cols[:, 1] - merged_cols[:, 0]) >= min_col_width_heuristic
+        columns = [tuple(c) for c in merged_cols[wide_enough].tolist()]
             
     return columns if columns else [(page_min_x, page_max_x)]
 
 
+def _four_column_fast_path(note_header_aa, year1_header_aa, year2_header_aa,
+                           page_min_x, page_max_x, min_sensible_col_width):
+    """
+    Builds the Description / Note / Year1 / Year2 columns directly when the header
+    boxes are laid out in the common financial-statement arrangement.
+
+    Precondition: note.xmax < year1.xmin < year1.xmax < year2.xmin, and every one of
+    the four resulting columns is wider than `min_sensible_col_width`. Under these
+    conditions the general boundary fix-ups in `identify_columns_by_dynamic_years`
+    are all no-ops, so the gutter midpoints can be used as-is.
+
+    Returns:
+        list or None: Four (col_xmin, col_xmax) tuples, or None if the precondition fails.
+    """
+    if not (note_header_aa[2] < year1_header_aa[0] < year1_header_aa[2] < year2_header_aa[0]):
+        return None
+
+    # Gutter midpoints between Note/Year1 and Year1/Year2
+    note_col_start = note_header_aa[0]
+    note_col_end = (note_header_aa[2] + year1_header_aa[0]) / 2.0
+    year1_col_end = (year1_header_aa[2] + year2_header_aa[0]) / 2.0
+
+    boundaries = (page_min_x, note_col_start, note_col_end, year1_col_end, page_max_x)
+    columns = list(zip(boundaries[:-1], boundaries[1:]))
+    if any(col_x2 <= col_x1 + min_sensible_col_width for col_x1, col_x2 in columns):
+        return None
+    return columns
+
+
 def identify_columns_by_dynamic_years(ocr_results, page_min_x, page_max_x,
                                       note_keyword="Note", expected_col_count=4,
                                       year_is_4_digits=True, min_year=1990, max_year=2050,
                                       vertical_alignment_tolerance_factor=0.75, # % of Note height
-                                      min_col_width_ratio_of_note=0.3):
+                                      min_col_width_ratio_of_note=0.3,
+                                      aa_boxes=None, texts=None):
     """
     Identifies columns based on a 'Note' keyword and dynamically found year headers
     (e.g., "2023", "2024") appearing on roughly the same vertical line as 'Note'.
     This is tailored for financial statements or similar tabular data.
 
+    When exactly four columns are expected and the 'Note' and two year headers are
+    strictly left-to-right (note.xmax < year1.xmin < year1.xmax < year2.xmin) with
+    every derived column wider than the minimum sensible width, the columns are
+    returned directly by `_four_column_fast_path`; otherwise the general boundary
+    refinement below is used.
+
     Args:
         ocr_results (list): List of (polygon_box, text_content) tuples from OCR.
         page_min_x (float): Min x-coordinate of page content.
@@ -326,6 +526,10 @@ def identify_columns_by_dynamic_years(ocr_results, page_min_x, page_max_x,
                                                      vertical alignment tolerance for year headers.
         min_col_width_ratio_of_note (float): Minimum width of a derived column, as a ratio
                                              of the 'Note' keyword box's width.
+        aa_boxes (np.ndarray, optional): Already converted (N, 4) axis-aligned boxes (NaN rows
+                                         for invalid polygons), with the matching `texts`.
+                                         If given, `ocr_results` is not used.
+        texts (list, optional): Text of each box in `aa_boxes`.
     Returns:
         list or None: List of (col_xmin, col_xmax) tuples for identified columns,
                       or None if key elements are not found or criteria not met.
@@ -333,11 +537,17 @@ def identify_columns_by_dynamic_years(ocr_results, page_min_x, page_max_x,
     note_header_aa = None
     potential_headers_on_note_line = [] # Store boxes that are vertically aligned with 'Note'
 
+    # Convert all boxes once (unless the caller already did); keep (aa_box, text) pairs for the valid ones
+    if aa_boxes is None:
+        aa_boxes = convert_polygons_to_axis_aligned([poly_box for poly_box, _ in ocr_results])
+        texts = [text for _, (text, _) in ocr_results] # Assuming ocr_results are (box, (text, score))
+    valid_aa = ~np.isnan(aa_boxes).any(axis=1)
+    aa_with_text = [(aa_box, text) for aa_box, text, is_valid
+                    in zip(aa_boxes.tolist(), texts, valid_aa) if is_valid]
+
     # First, find the 'Note' keyword box. Prefer the topmost if multiple exist.
-    for poly_box, (text, _) in ocr_results: # Assuming ocr_results are (box, (text, score))
+    for aa_box, text in aa_with_text:
         text_content = text # text is already the string
-        aa_box = convert_to_axis_aligned(poly_box)
-        if not aa_box: continue
         clean_text = text_content.strip()
         if clean_text == note_keyword:
             if note_header_aa is None or aa_box[1] < note_header_aa[1]: # Take the highest 'Note'
@@ -358,10 +568,8 @@ def identify_columns_by_dynamic_years(ocr_results, page_min_x, page_max_x,
                              if note_box_width > 0 else 20.0 # Default min width
 
     # Find all text boxes that are vertically aligned with the 'Note' keyword box
-    for poly_box, (text, _) in ocr_results:
+    for aa_box, text in aa_with_text:
         text_content = text
-        aa_box = convert_to_axis_aligned(poly_box)
-        if not aa_box: continue
         box_y_center = (aa_box[1] + aa_box[3]) / 2.0
         if abs(box_y_center - note_y_center) < vertical_tolerance: # Check vertical alignment
             potential_headers_on_note_line.append({'text': text_content.strip(), 'box_aa': aa_box})
@@ -371,12 +579,9 @@ def identify_columns_by_dynamic_years(ocr_results, page_min_x, page_max_x,
     for header_info in potential_headers_on_note_line:
         text_val, box_aa = header_info['text'], header_info['box_aa']
         if box_aa[0] > note_header_aa[2]: # Must be to the right of the "Note" box's x_max
-            is_year = False
-            if year_is_4_digits and len(text_val) == 4 and text_val.isdigit():
-                year_num = int(text_val)
-                if min_year <= year_num <= max_year:
-                    is_year = True
-            if is_year:
+            # `and` short-circuits: int() only runs on 4-digit texts
+            if year_is_4_digits and len(text_val) == 4 and text_val.isdigit() \
+               and min_year <= int(text_val) <= max_year:
                 year_candidates_on_line.append(box_aa)
 
     # We expect at least two year columns (e.g., current year, previous year)
@@ -386,10 +591,20 @@ def identify_columns_by_dynamic_years(ocr_results, page_min_x, page_max_x,
         return None
 
     # Sort year candidates by their x-coordinate to get Year1 and Year2 in order
-    year_candidates_on_line.sort(key=lambda b: b[0])
+    year_candidates_on_line.sort(key=operator.itemgetter(0))
     year1_header_aa = year_candidates_on_line[0]
     year2_header_aa = year_candidates_on_line[1]
 
+    # Fast path for the common Description / Note / Year1 / Year2 arrangement
+    if expected_col_count == 4:
+        fast_columns = _four_column_fast_path(
+            note_header_aa, year1_header_aa, year2_header_aa,
+            page_min_x, page_max_x, min_sensible_col_width
+        )
+        if fast_columns is not None:
+            print(f"Successfully identified {len(fast_columns)} columns using '{note_keyword}' and dynamically found year headers.")
+            return fast_columns
+
     # Define column boundaries based on these key header boxes
     # Col 0 (Description): From page start to start of 'Note' column
     # Col 1 (Note): Defined by the 'Note' keyword box, ends at gutter before Year1
@@ -489,11 +704,9 @@ def identify_columns_by_dynamic_years(ocr_results, page_min_x, page_max_x,
              # Or, if 'Note' is the second column, take one before, 'Note', and two after.
              
              # Find index of 'Note' column (whose start is s1_note_col_start)
-             note_col_index = -1
-             for idx, (cx1, _) in enumerate(final_columns):
-                 if abs(cx1 - s1_note_col_start) < min_sensible_col_width / 2.0 : # If it starts near 'Note'
-                     note_col_index = idx
-                     break
+             note_col_index = next((idx for idx, (cx1, _) in enumerate(final_columns)
+                                    if abs(cx1 - s1_note_col_start) < min_sensible_col_width / 2.0), # If it starts near 'Note'
+                                   -1)
              
              if note_col_index != -1 and note_col_index > 0 and (note_col_index + (expected_col_count - 2)) < len(final_columns) :
                  # Try to construct: [col_before_note, note_col, year1_col, year2_col]
@@ -518,17 +731,21 @@ def identify_columns_by_dynamic_years(ocr_results, page_min_x, page_max_x,
 # --- Main Orchestration Function for Layout Analysis ---
 
 def process_document_layout_with_ocr(
-    ocr_results_tuples, # Expects list of (polygon_box, (text_content, score))
+    ocr_results_tuples=None, # Expects list of (polygon_box, (text_content, score))
     word_expansion_factor_global=0.1, row_v_overlap_ratio_global=0.3,
     word_expansion_factor_in_col=0.02, row_v_overlap_ratio_in_col=0.4,
     col_id_method='keywords_else_simple', # 'keywords_only', 'simple_only'
     col_note_keyword="Note", 
     # Parameters for simple_only or fallback:
-    col_smooth_window=5, col_gap_thresh_factor=0.05, col_min_width_pixels=50
+    col_smooth_window=5, col_gap_thresh_factor=0.05, col_min_width_pixels=50,
+    polygon_boxes=None, texts=None
 ):
     """
     Processes OCR results to determine document layout: columns, spanning rows, and in-column rows.
 
+    The OCR results can be given either as a list of tuples (`ocr_results_tuples`) or,
+    avoiding per-box Python objects, as separate arrays (`polygon_boxes` and `texts`).
+
     Args:
         ocr_results_tuples (list): List of (polygon_box, (text_content, score)) tuples.
         word_expansion_factor_global (float): Horizontal expansion for global row formation.
@@ -538,6 +755,9 @@ def process_document_layout_with_ocr(
         col_id_method (str): 'keywords_else_simple', 'keywords_only', or 'simple_only'.
         col_note_keyword (str): Keyword for the 'Note' column (for keyword-based method).
         col_smooth_window, col_gap_thresh_factor, col_min_width_pixels: Params for simple column ID.
+        polygon_boxes (np.ndarray, optional): (N, 4, 2) polygon boxes, used instead of
+                                              `ocr_results_tuples` when given.
+        texts (list, optional): Recognized text of each box in `polygon_boxes`.
 
     Returns:
         tuple: (final_full_length_rows_in_cols, spanning_row_boxes, columns)
@@ -545,16 +765,30 @@ def process_document_layout_with_ocr(
                  extended to full column width.
                - spanning_row_boxes: List of AA boxes for rows that span multiple columns.
                - columns: List of (col_xmin, col_xmax) tuples for identified columns.
-    """
-    if not ocr_results_tuples: 
-        return [], [], []
 
-    # Extract initial polygon boxes and also keep the text for keyword search
-    initial_polygon_boxes = [item[0] for item in ocr_results_tuples]
+    This function is thread-safe: it keeps no shared mutable state, and the optional Numba
+    kernel is compiled without Numba's own threading so concurrent calls are safe. Only part
+    of the work releases the GIL (the NumPy array operations and the Numba kernel); row
+    merging (`_merge_aa_boxes_into_rows`) and the column-profile scan are Python loops that
+    hold it. See `process_document_layout_batch` for processing pages in threads.
+    """
+    if polygon_boxes is None:
+        if not ocr_results_tuples: 
+            return [], [], []
+        # Extract initial polygon boxes and also keep the text for keyword search
+        initial_polygon_boxes = [item[0] for item in ocr_results_tuples]
+        texts = [item[1][0] for item in ocr_results_tuples]
+    else:
+        if len(polygon_boxes) == 0:
+            return [], [], []
+        initial_polygon_boxes = polygon_boxes
     
-    # Convert all initial polygon boxes to axis-aligned boxes for general use
-    all_aa_boxes = [b for b in [convert_to_axis_aligned(pb) for pb in initial_polygon_boxes] 
-                    if b and (b[2]-b[0]>1e-6) and (b[3]-b[1]>1e-6)] # Filter invalid/small
+    # Convert all initial polygon boxes to axis-aligned boxes once; this (N, 4) array
+    # (NaN rows for invalid polygons) is reused by every step below
+    initial_aa = convert_polygons_to_axis_aligned(initial_polygon_boxes)
+    initial_widths = initial_aa[:, 2] - initial_aa[:, 0]
+    initial_heights = initial_aa[:, 3] - initial_aa[:, 1]
+    all_aa_boxes = initial_aa[(initial_widths > 1e-6) & (initial_heights > 1e-6)].tolist() # Filter invalid/small
     if not all_aa_boxes: 
         return [], [], []
     
@@ -565,8 +799,9 @@ def process_document_layout_with_ocr(
     if col_id_method in ['keywords_else_simple', 'keywords_only']:
         columns = identify_columns_by_dynamic_years(
             ocr_results_tuples, page_min_x, page_max_x,
-            note_keyword=col_note_keyword
+            note_keyword=col_note_keyword,
             # Other dynamic_years params use defaults
+            aa_boxes=initial_aa, texts=texts
         )
     
     if columns is None and col_id_method in ['keywords_else_simple', 'simple_only']:
@@ -586,93 +821,113 @@ def process_document_layout_with_ocr(
         print("Warning: All column identification methods failed. Defaulting to single page-wide column.")
         columns = [(page_min_x, page_max_x)]
 
+    # Contiguous column boundary arrays, built once and reused below
+    col_starts, col_ends = column_bounds_to_arrays(columns)
+
+    if len(columns) == 1:
+        # Single-column page: no row can span columns, so the global row pass and the
+        # subsumption test are skipped. Boxes still need >50% width overlap with the column.
+        col_xmin_bound, col_xmax_bound = columns[0]
+        valid_indices = np.flatnonzero(initial_widths * initial_heights > 1e-6)
+        in_column = assign_boxes_to_columns(initial_aa[valid_indices], col_starts, col_ends) == 0
+        boxes_for_this_col_aa = initial_aa[valid_indices[in_column]]
+        if not len(boxes_for_this_col_aa):
+            return [], [], columns
+        rows_made_in_col_aa = _merge_aa_boxes_into_rows(
+            boxes_for_this_col_aa, word_expansion_factor_in_col, row_v_overlap_ratio_in_col
+        )
+        return [[col_xmin_bound, r_ymin, col_xmax_bound, r_ymax]
+                for _, r_ymin, _, r_ymax in rows_made_in_col_aa if r_ymax > r_ymin + 1e-3], [], columns
 
     # --- Identify Spanning Rows vs. Non-Spanning (potentially in-column) Rows ---
     # First, form rows globally from all initial polygon boxes
-    globally_formed_rows_aa = create_rows_from_boxes(
-        initial_polygon_boxes, 
+    globally_formed_rows_aa = _merge_aa_boxes_into_rows(
+        initial_aa, 
         word_expansion_factor_global, 
         row_v_overlap_ratio_global
     )
 
-    spanning_row_boxes = [] # Rows that clearly span multiple identified columns
-    non_spanning_global_rows_aa = [] # Rows that seem to belong to a single column or unassigned
+    # Rows that clearly span multiple identified columns
+    rows_np = np.asarray(globally_formed_rows_aa, dtype=np.float64).reshape(-1, 4)
+    # Columns each row overlaps, via a binary-search interval sweep (no (R, C) matrix)
+    is_spanning = count_columns_touched(rows_np, col_starts, col_ends) > 1
+    spanning_np = rows_np[is_spanning]
+    spanning_row_boxes = spanning_np.tolist()
 
-    if columns and len(columns) > 1:
-        for r_xmin, r_ymin, r_xmax, r_ymax in globally_formed_rows_aa:
-            cols_touched_indices = set()
-            for i, (col_xmin_bound, col_xmax_bound) in enumerate(columns):
-                # Check for overlap: max of starts < min of ends
-                if max(r_xmin, col_xmin_bound) < min(r_xmax, col_xmax_bound):
-                    cols_touched_indices.add(i)
-            
-            if len(cols_touched_indices) > 1:
-                spanning_row_boxes.append([r_xmin, r_ymin, r_xmax, r_ymax])
-            else:
-                non_spanning_global_rows_aa.append([r_xmin, r_ymin, r_xmax, r_ymax])
-    else: # If only one column (or no columns identified), all global rows are non-spanning by definition
-        non_spanning_global_rows_aa = list(globally_formed_rows_aa)
-    
     # --- Refine In-Column Rows ---
     # Filter initial polygon boxes: remove those largely subsumed by spanning rows
-    non_spanning_initial_polys = []
-    for poly_box in initial_polygon_boxes:
-        aa_box_temp = convert_to_axis_aligned(poly_box)
-        if not aa_box_temp: continue
-
-        box_area = (aa_box_temp[2]-aa_box_temp[0]) * (aa_box_temp[3]-aa_box_temp[1])
-        if box_area <= 1e-6: continue # Skip zero-area boxes
-
-        is_subsumed_by_spanning_row = False
-        for sx1,sy1,sx2,sy2 in spanning_row_boxes:
-            # Calculate overlap area
-            overlap_x_start = max(aa_box_temp[0], sx1)
-            overlap_x_end = min(aa_box_temp[2], sx2)
-            overlap_y_start = max(aa_box_temp[1], sy1)
-            overlap_y_end = min(aa_box_temp[3], sy2)
-            
-            overlap_width = max(0, overlap_x_end - overlap_x_start)
-            overlap_height = max(0, overlap_y_end - overlap_y_start)
-            overlap_area = overlap_width * overlap_height
-            
-            # If a significant portion (e.g., >70%) of the box is within a spanning row, consider it subsumed
-            if overlap_area / box_area > 0.7: 
-                is_subsumed_by_spanning_row = True
-                break
-        
-        if not is_subsumed_by_spanning_row:
-            non_spanning_initial_polys.append(poly_box)
+    initial_areas = initial_widths * initial_heights
+    has_valid_aa = initial_areas > 1e-6 # Skips invalid (NaN) and zero-area boxes
+
+    valid_indices = np.flatnonzero(has_valid_aa)
+
+    # Drop boxes largely inside a spanning row and assign each remaining box to the
+    # column it primarily belongs to (>50% width overlap)
+    if NUMBA_AVAILABLE:
+        # One compiled pass over the boxes (GIL released) that does both tests without
+        # materializing any (N, C) or (N, S) temporaries
+        assigned_valid, is_subsumed = assign_and_filter(
+            initial_aa[valid_indices], np.column_stack((col_starts, col_ends)), spanning_np, 0.7
+        )
+        non_spanning_indices = valid_indices[~is_subsumed]
+        assigned_col_indices = assigned_valid[~is_subsumed]
+    else:
+        # If a significant portion (e.g., >70%) of the box is within a spanning row, consider it subsumed
+        is_subsumed = find_boxes_subsumed_by_rows(
+            initial_aa[valid_indices], initial_areas[valid_indices], spanning_np, 0.7
+        )
+        non_spanning_indices = valid_indices[~is_subsumed]
+        # One argmax over the (N, C) width-overlap matrix, reusing the converted boxes
+        assigned_col_indices = assign_boxes_to_columns(initial_aa[non_spanning_indices], col_starts, col_ends)
 
     # Now, for each column, take the non-spanning polygon boxes assigned to it
     # and re-form rows within that column, then extend these rows to full column width.
     final_full_length_rows_in_cols = []
-    if columns:
-        for col_idx, (col_xmin_bound, col_xmax_bound) in enumerate(columns):
-            # Get polygon boxes that primarily belong to this column
-            # using assign_box_to_column_by_overlap which checks for >50% width overlap
-            boxes_for_this_col_poly = []
-            for pb in non_spanning_initial_polys:
-                aa_pb = convert_to_axis_aligned(pb)
-                if aa_pb and assign_box_to_column_by_overlap(aa_pb, [columns[col_idx]]) == 0: # 0 because we pass a list with one col
-                    boxes_for_this_col_poly.append(pb)
-            
-            if boxes_for_this_col_poly:
-                # Create rows specifically from words within this column
-                rows_made_in_col_aa = create_rows_from_boxes(
-                    boxes_for_this_col_poly,
-                    word_expansion_factor_in_col, # Tighter expansion within a column
-                    row_v_overlap_ratio_in_col
-                )
-                # Extend these in-column rows to the full width of the column
-                for r_xmin,r_ymin,r_xmax,r_ymax in rows_made_in_col_aa:
-                    if r_ymax > r_ymin + 1e-3: # Ensure row has some height
-                        # The row's x-coordinates are now the column's boundaries
-                        final_full_length_rows_in_cols.append([col_xmin_bound, r_ymin, col_xmax_bound, r_ymax])
-    
-    elif non_spanning_global_rows_aa: # Fallback if no columns were properly identified (single column mode)
-        # Treat global non-spanning rows as the final rows, extending them to page width
-        for r_xmin,r_ymin,r_xmax,r_ymax in non_spanning_global_rows_aa:
-            if r_ymax > r_ymin + 1e-3:
-                final_full_length_rows_in_cols.append([page_min_x, r_ymin, page_max_x, r_ymax])
-                
-    return final_full_length_rows_in_cols, spanning_row_boxes, columns
\ No newline at end of file
+    # Group the boxes by column with one stable sort instead of one scan per column:
+    # boxes of column c are order[col_bounds[c]:col_bounds[c + 1]] (unassigned -1 sort first)
+    order = np.argsort(assigned_col_indices, kind='stable')
+    col_bounds = np.searchsorted(assigned_col_indices[order], np.arange(len(columns) + 1))
+    for col_idx, (col_xmin_bound, col_xmax_bound) in enumerate(columns):
+        # Get (axis-aligned) boxes that primarily belong to this column
+        boxes_for_this_col_aa = initial_aa[non_spanning_indices[order[col_bounds[col_idx]:col_bounds[col_idx + 1]]]]
+        
+        if len(boxes_for_this_col_aa):
+            # Create rows specifically from words within this column
+            rows_made_in_col_aa = _merge_aa_boxes_into_rows(
+                boxes_for_this_col_aa,
+                word_expansion_factor_in_col, # Tighter expansion within a column
+                row_v_overlap_ratio_in_col
+            )
+            # Extend these in-column rows to the full width of the column
+            for r_xmin,r_ymin,r_xmax,r_ymax in rows_made_in_col_aa:
+                if r_ymax > r_ymin + 1e-3: # Ensure row has some height
+                    # The row's x-coordinates are now the column's boundaries
+                    final_full_length_rows_in_cols.append([col_xmin_bound, r_ymin, col_xmax_bound, r_ymax])
+
+    return final_full_length_rows_in_cols, spanning_row_boxes, columns
+
+
+def process_document_layout_batch(pages_ocr, max_workers=None, **layout_params):
+    """
+    Runs `process_document_layout_with_ocr` over independent pages in parallel threads.
+    Threads overlap the GIL-free parts of each page (NumPy and the Numba kernel); the Python
+    row-merging loops still run one at a time, so for large CPU-bound batches a process
+    pool (as in main.py) scales better.
+
+    Args:
+        pages_ocr (list): One list of (polygon_box, (text_content, score)) tuples per page.
+        max_workers (int, optional): Number of worker threads. Defaults to os.cpu_count().
+        **layout_params: Keyword arguments forwarded to `process_document_layout_with_ocr`.
+
+    Returns:
+        list: One (final_full_length_rows_in_cols, spanning_row_boxes, columns) tuple
+              per page, in the same order as `pages_ocr`.
+    """
+    if not pages_ocr:
+        return []
+
+    def process_page(page_ocr):
+        return process_document_layout_with_ocr(page_ocr, **layout_params)
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        return list(executor.map(process_page, pages_ocr))
@@ -2,38 +2,76 @@
 # 1. Perform OCR on an image using functions from ocr_utils.py.
 # 2. Analyze the document layout (columns, rows) using functions from layout_analysis.py.
 # 3. Visualize the different stages of layout analysis using functions from visualize_layout.py.
+# Several pages are processed in parallel, one worker process per page.
 
 import os
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image, ImageDraw, ImageFont # For dummy image creation if needed
 
 # Import functions from the other created modules
-from ocr_utils import predict_and_visualize_ocr
+from ocr_utils import get_ocr_engine, predict_and_visualize_ocr, predict_and_visualize_ocr_batch
 from layout_analysis import process_document_layout_with_ocr
 from visualize_layout import visualize_layout_stages_on_image
 
-def main():
-    print("Starting Document Layout Analysis Pipeline...")
+# Each OCR worker process loads its own PaddleOCR engine (several hundred MB of models and
+# predictor state), and Paddle's CPU predictor runs its own thread pool (PaddleOCR's cpu_threads,
+# 10 by default). By default the cores are split between predictors and at most
+# MAX_DEFAULT_OCR_WORKERS workers are started, so memory grows with the worker count, not the cores.
+MAX_DEFAULT_OCR_WORKERS = 4
+OCR_PREDICTOR_THREADS = 10
 
-    # --- Configuration ---
-    image_file_path = "docs/page11.jpg"
-    ocr_language = 'en'
-    font_for_drawing = None 
+def _default_ocr_workers(num_pages):
+    """Number of OCR worker processes for `num_pages` pages when `max_workers` is not given."""
+    by_cores = max(1, (os.cpu_count() or 1) // OCR_PREDICTOR_THREADS)
+    return max(1, min(num_pages, MAX_DEFAULT_OCR_WORKERS, by_cores))
 
-    # Directory to save the output visualization images
-    output_visualization_dir = "output/document_layouts"
-    if not os.path.exists(output_visualization_dir):
-        os.makedirs(output_visualization_dir)
-        print(f"Created output directory: {output_visualization_dir}")
+def _paddle_compiled_with_cuda():
+    """True if the installed PaddlePaddle build has CUDA support. paddle is imported here, not at
+    module load, since it takes seconds to import (see `ocr_utils._paddle_mod`)."""
+    import paddle
+    return paddle.is_compiled_with_cuda()
+
+def _init_ocr_worker(lang, ocr_options):
+    """Loads the PaddleOCR engine once per worker process, before it takes any page."""
+    get_ocr_engine(lang, **ocr_options)
+
+def process_one(image_path, layout_params, lang='en', ocr_options=None, font_path=None,
+                output_dir="output/document_layouts", ocr_results_data=None, draw_ocr_annotations=False,
+                visualization_max_dim=None):
+    """
+    Runs OCR, layout analysis and the layout visualizations for a single image.
+
+    Args:
+        image_path (str): Path to the page image.
+        layout_params (dict): Keyword arguments for `process_document_layout_with_ocr`.
+        lang (str): Language code for OCR.
+        ocr_options (dict, optional): Engine options for `predict_and_visualize_ocr`
+                                      (use_gpu, *_model_dir, ...).
+        font_path (str, optional): Path to a .ttf font file for drawing text.
+        output_dir (str): Directory to save the output visualization images.
+        ocr_results_data (dict, optional): Result of `predict_and_visualize_ocr` for this image,
+                                           if OCR already ran (e.g. in a batch); OCR is skipped then.
+        draw_ocr_annotations (bool): Also draw and save the raw OCR results. Off by default,
+                                     since the layout stages (step 3) draw the OCR boxes again.
+        visualization_max_dim (int, optional): Longest side of the layout stage images; larger
+                                               pages are drawn downscaled. None keeps full size.
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        print(f"Created output directory: {output_dir}")
 
     # --- Step 1: Perform OCR and Initial Visualization ---
-    print(f"\n--- Step 1: Performing OCR on '{image_file_path}' ---")
-    
-    ocr_results_data = predict_and_visualize_ocr(
-        image_path=image_file_path,
-        lang=ocr_language,
-        font_path=font_for_drawing,
-        use_custom_draw=True # Use the more detailed custom drawing for initial OCR viz
-    )
+    print(f"\n--- Step 1: Performing OCR on '{image_path}' ---")
+
+    if ocr_results_data is None:
+        ocr_results_data = predict_and_visualize_ocr(
+            image_path=image_path,
+            lang=lang,
+            font_path=font_path,
+            use_custom_draw=True, # Use the more detailed custom drawing for initial OCR viz
+            draw=draw_ocr_annotations,
+            **(ocr_options or {})
+        )
 
     if not ocr_results_data or not ocr_results_data["ocr_data"]:
         print("OCR process failed or no text detected. Cannot proceed with layout analysis.")
@@ -41,48 +79,25 @@ def main():
 
     # Save the initially annotated OCR image
     if ocr_results_data["image_annotated"]:
-        ocr_output_path = os.path.join(output_visualization_dir, f"00_ocr_annotated_{os.path.basename(image_file_path)}")
+        ocr_output_path = os.path.join(output_dir, f"00_ocr_annotated_{os.path.basename(image_path)}")
         ocr_results_data["image_annotated"].save(ocr_output_path)
         print(f"Initial OCR annotated image saved to: {ocr_output_path}")
 
-    # Prepare OCR results for layout analysis: list of (polygon_box, (text_content, score))
-    # The `process_document_layout_with_ocr` function expects this format.
-    # `ocr_results_data["ocr_data"]` is like: [[[points, (text, confidence)], ...]] for a single image.
-    
-    ocr_data_for_layout = []
-    if ocr_results_data["ocr_data"] and ocr_results_data["ocr_data"][0]:
-        lines = ocr_results_data["ocr_data"][0] # For a single image result
-        for line_info in lines:
-            # line_info is [points, (text, confidence)]
-            polygon_box = line_info[0]
-            text_content = line_info[1][0]
-            score = line_info[1][1]
-            ocr_data_for_layout.append((polygon_box, (text_content, score)))
-    
-    if not ocr_data_for_layout:
+    # OCR results are passed to the layout analysis as arrays: `ocr_results_data["boxes"]` is an
+    # (N, 4, 2) polygon array and `ocr_results_data["texts"]` the matching list of texts.
+    ocr_boxes = ocr_results_data["boxes"]
+    ocr_texts = ocr_results_data["texts"]
+
+    if ocr_boxes is None or len(ocr_boxes) == 0:
         print("No valid OCR data extracted to proceed with layout analysis.")
         return
 
     # --- Step 2: Process Document Layout ---
     print(f"\n--- Step 2: Processing Document Layout ---")
-    
-    # Parameters for layout analysis (can be tuned)
-    # Refer to layout_analysis.py for details on these parameters.
-    layout_params = {
-        "word_expansion_factor_global": 0.05, # Smaller global expansion can be better
-        "row_v_overlap_ratio_global": 0.3,
-        "word_expansion_factor_in_col": 0.01, # Minimal expansion within columns
-        "row_v_overlap_ratio_in_col": 0.3,
-        "col_id_method": 'keywords_else_simple',  # Try keyword-based first, then fallback
-        "col_note_keyword": "Note",            # Keyword for the 'Note' column
-        # Fallback parameters for 'simple_only' or if keyword method fails:
-        "col_smooth_window": 5,
-        "col_gap_thresh_factor": 0.02,        # More sensitive to small gaps for fallback
-        "col_min_width_pixels": 20            # Smaller min width for columns in fallback
-    }
 
     full_col_rows, spanning_rows, identified_cols = process_document_layout_with_ocr(
-        ocr_results_tuples=ocr_data_for_layout,
+        polygon_boxes=ocr_boxes,
+        texts=ocr_texts,
         **layout_params
     )
 
@@ -95,21 +110,97 @@ def main():
 
     # --- Step 3: Visualize Layout Stages ---
     print(f"\n--- Step 3: Visualizing Layout Stages ---")
-    
-    # The initial_ocr_results for visualization needs to be in the format:
-    # [(poly_box, (text, score)), ...] which `ocr_data_for_layout` already is.
+
+    # The initial_ocr_results for visualization only need the polygon boxes.
     visualize_layout_stages_on_image(
-        image_path=image_file_path,
-        initial_ocr_results=ocr_data_for_layout, 
+        image_path=image_path,
+        initial_ocr_results=ocr_boxes,
         full_length_single_col_rows=full_col_rows,
         spanning_row_boxes=spanning_rows,
         identified_cols=identified_cols,
-        output_dir=output_visualization_dir,
-        base_font_path=font_for_drawing 
+        output_dir=output_dir,
+        base_font_path=font_path,
+        max_dim=visualization_max_dim
     )
-    
-    print(f"All visualization images saved in '{os.path.abspath(output_visualization_dir)}'")
+
+    print(f"All visualization images saved in '{os.path.abspath(output_dir)}'")
+
+def main(image_file_paths=("docs/page11.jpg",), max_workers=None):
+    print("Starting Document Layout Analysis Pipeline...")
+
+    # --- Configuration ---
+    ocr_language = 'en'
+    font_for_drawing = None
+    # The raw OCR results are only drawn on request: the layout stages (step 3) draw the OCR boxes anyway
+    draw_ocr_annotations = False
+    use_gpu_for_ocr = _paddle_compiled_with_cuda() # Use the GPU when paddlepaddle-gpu is installed
+    # Optional directories of custom inference models (e.g. fine-tuned or PP-OCRv4 slim); None uses
+    # the default models. Set quantized_ocr_models for quantized (slim) models: OCR then runs in INT8
+    # on the CPU.
+    ocr_model_dirs = {"det_model_dir": None, "rec_model_dir": None, "cls_model_dir": None}
+    quantized_ocr_models = False
+    # TensorRT (FP16) on the GPU is opt-in: it needs the TensorRT runtime installed separately
+    use_tensorrt_for_ocr = False
+    ocr_options = {"use_gpu": use_gpu_for_ocr, "use_tensorrt": use_tensorrt_for_ocr,
+                   "quantized": quantized_ocr_models, **ocr_model_dirs}
+
+    # Directory to save the output visualization images
+    output_visualization_dir = "output/document_layouts"
+    # Longest side of the stage images; full-resolution scans are downscaled for drawing (None: full size)
+    visualization_max_dim = 1600
+
+    # Parameters for layout analysis (can be tuned)
+    # Refer to layout_analysis.py for details on these parameters.
+    layout_params = {
+        "word_expansion_factor_global": 0.05, # Smaller global expansion can be better
+        "row_v_overlap_ratio_global": 0.3,
+        "word_expansion_factor_in_col": 0.01, # Minimal expansion within columns
+        "row_v_overlap_ratio_in_col": 0.3,
+        "col_id_method": 'keywords_else_simple',  # Try keyword-based first, then fallback
+        "col_note_keyword": "Note",            # Keyword for the 'Note' column
+        # Fallback parameters for 'simple_only' or if keyword method fails:
+        "col_smooth_window": 5,
+        "col_gap_thresh_factor": 0.02,        # More sensitive to small gaps for fallback
+        "col_min_width_pixels": 20            # Smaller min width for columns in fallback
+    }
+
+    if len(image_file_paths) == 1:
+        # A single page runs in this process; a worker pool would only add start-up cost
+        process_one(image_file_paths[0], layout_params, lang=ocr_language, ocr_options=ocr_options,
+                    font_path=font_for_drawing, output_dir=output_visualization_dir,
+                    draw_ocr_annotations=draw_ocr_annotations, visualization_max_dim=visualization_max_dim)
+        print("Document Layout Analysis Pipeline Finished.")
+        return
+
+    # Each page writes its images to its own sub-directory
+    output_dirs = [os.path.join(output_visualization_dir, os.path.splitext(os.path.basename(path))[0])
+                   for path in image_file_paths]
+    if use_gpu_for_ocr:
+        # A GPU is shared by one process; several processes would each hold a copy of the models.
+        # All pages go through one engine with a larger recognition batch, then layout runs per page.
+        all_ocr_results = predict_and_visualize_ocr_batch(image_file_paths, lang=ocr_language,
+                                                          font_path=font_for_drawing, draw=draw_ocr_annotations,
+                                                          **ocr_options)
+        for path, page_output_dir, page_ocr_results in zip(image_file_paths, output_dirs, all_ocr_results):
+            process_one(path, layout_params, lang=ocr_language, ocr_options=ocr_options,
+                        font_path=font_for_drawing, output_dir=page_output_dir,
+                        ocr_results_data=page_ocr_results, draw_ocr_annotations=draw_ocr_annotations,
+                        visualization_max_dim=visualization_max_dim)
+    else:
+        # Pages are independent, but PaddleOCR model state is per process: each worker process
+        # loads its own engine (in the initializer) and then takes whole pages.
+        num_workers = max_workers or _default_ocr_workers(len(image_file_paths))
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_ocr_worker,
+                                 initargs=(ocr_language, ocr_options)) as executor:
+            futures = [executor.submit(process_one, path, layout_params, lang=ocr_language,
+                                       ocr_options=ocr_options, font_path=font_for_drawing,
+                                       output_dir=page_output_dir, draw_ocr_annotations=draw_ocr_annotations,
+                                       visualization_max_dim=visualization_max_dim)
+                       for path, page_output_dir in zip(image_file_paths, output_dirs)]
+            for future in futures:
+                future.result() # Re-raises a worker's exception
+
     print("Document Layout Analysis Pipeline Finished.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,10 +1,191 @@
 # This script contains utility functions for performing OCR using PaddleOCR
 # and visualizing the raw OCR results on an image.
 
-from PIL import Image, ImageDraw, ImageFont
-from paddleocr import PaddleOCR
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+from functools import lru_cache
+import numpy as np
 import os
 
+# paddleocr (and paddle) take seconds to import, so the module is only imported when an
+# OCR engine or PaddleOCR's draw_ocr is first needed; drawing helpers work without it.
+_paddle = None
+
+def _paddle_mod():
+    """Returns the paddleocr module, importing it on first use."""
+    global _paddle
+    if _paddle is None:
+        import paddleocr as _p
+        _paddle = _p
+    return _paddle
+
+@lru_cache(maxsize=8)
+def _get_engine(lang, use_gpu=False, enable_mkldnn=False, use_tensorrt=False,
+                det_db_box_thresh=0.6, rec_batch_num=6, precision='fp32',
+                det_model_dir=None, rec_model_dir=None, cls_model_dir=None):
+    """
+    Returns a PaddleOCR engine for the given settings, creating it on first use.
+    Engine construction loads the detection/recognition models from disk, so the
+    engine is cached and reused by every later call with the same settings.
+    """
+    # - use_angle_cls=True: enable text angle classification.
+    # - lang: specify the language.
+    # - use_gpu=True/False: set to True if you installed paddlepaddle-gpu and have a GPU.
+    # - enable_mkldnn: use oneDNN (MKL-DNN) kernels for CPU inference.
+    # - use_tensorrt: run the GPU models through TensorRT (GPU only).
+    # - det_db_box_thresh / rec_batch_num: detection box threshold and recognition batch size.
+    # - precision: 'fp32', 'fp16' (GPU) or 'int8' (quantized models).
+    # - *_model_dir: custom (e.g. fine-tuned or PP-OCRv4 slim) inference models; None uses the defaults.
+    # - show_log=False: suppress verbose PaddleOCR logging.
+    return _paddle_mod().PaddleOCR(use_angle_cls=True, lang=lang, use_gpu=use_gpu,
+                                   enable_mkldnn=enable_mkldnn, use_tensorrt=use_gpu and use_tensorrt,
+                                   det_db_box_thresh=det_db_box_thresh, rec_batch_num=rec_batch_num,
+                                   precision=precision, det_model_dir=det_model_dir,
+                                   rec_model_dir=rec_model_dir, cls_model_dir=cls_model_dir,
+                                   show_log=False)
+
+def _resolve_precision(precision, use_gpu, use_tensorrt, quantized):
+    """
+    Picks the inference precision when none is given: FP16 on the GPU with TensorRT,
+    INT8 on the CPU when the caller says the models are quantized, and FP32 otherwise.
+    """
+    if precision:
+        return precision
+    if use_gpu:
+        return 'fp16' if use_tensorrt else 'fp32'
+    return 'int8' if quantized else 'fp32'
+
+def get_ocr_engine(lang='en', use_gpu=False, enable_mkldnn=False, use_tensorrt=False,
+                   det_db_box_thresh=0.6, rec_batch_num=6, precision=None,
+                   det_model_dir=None, rec_model_dir=None, cls_model_dir=None, quantized=False):
+    """
+    Returns the (cached) PaddleOCR engine for the given settings; only the first call
+    with the same settings loads models. Takes the engine options of `predict_and_visualize_ocr`,
+    so it can also be used to warm up the engine, e.g. in a worker process initializer.
+    """
+    return _get_engine(lang, use_gpu=use_gpu,
+                       # oneDNN provides the INT8 kernels on the CPU
+                       enable_mkldnn=enable_mkldnn or (quantized and not use_gpu),
+                       use_tensorrt=use_tensorrt, det_db_box_thresh=det_db_box_thresh,
+                       rec_batch_num=rec_batch_num,
+                       precision=_resolve_precision(precision, use_gpu, use_tensorrt, quantized),
+                       det_model_dir=det_model_dir, rec_model_dir=rec_model_dir,
+                       cls_model_dir=cls_model_dir)
+
+@lru_cache(maxsize=32)
+def _load_ocr_font(font_path, default_font_name, font_size):
+    """
+    Loads the font used for OCR text labels: `font_path` if given, then
+    `default_font_name`, then Pillow's default font. Fonts are cached, so the
+    same font object is returned for the same settings across pages.
+    """
+    font = None
+    if font_path:
+        try:
+            font = ImageFont.truetype(font_path, font_size)
+        except IOError:
+            print(f"Warning: Could not load font at {font_path}. Trying default.")
+    
+    if not font: # If font_path failed or was not provided
+        try:
+            font = ImageFont.truetype(default_font_name, font_size)
+        except IOError:
+            # print(f"Warning: Could not load default font {default_font_name}. Using Pillow's default.")
+            try:
+                font = ImageFont.load_default(size=font_size) # Pillow 10+ allows size
+            except TypeError: # older Pillow
+                font = ImageFont.load_default()
+    return font
+
+@lru_cache(maxsize=4096)
+def _text_bbox(font, text):
+    """
+    Returns font.getbbox(text), memoized: OCR pages repeat many labels (numbers, 'Note', ...),
+    and getbbox shapes the whole text on every call. The cache holds a reference to each font,
+    so a font's identity cannot be reused by another font while its entries are cached.
+    """
+    return font.getbbox(text)
+
+def _prepare_box_geometry(boxes, font_size_ratio, min_font_size):
+    """
+    Converts OCR boxes to lists of (x, y) float tuples for Pillow and computes the
+    label font size of each box (a fraction of the box height, at least `min_font_size`).
+    Boxes are processed as one (N, P, 2) array when possible; otherwise box by box.
+
+    Returns:
+        tuple: (pil_boxes, font_sizes). pil_boxes[i] is None for invalid boxes.
+    """
+    try:
+        box_points = np.asarray(boxes, dtype=np.float64) # (N, P, 2)
+    except (ValueError, TypeError): # Ragged or non-numeric boxes
+        box_points = None
+
+    if box_points is not None and box_points.ndim == 3 and box_points.shape[1] > 0 \
+            and box_points.shape[2] == 2:
+        box_ys = box_points[:, :, 1]
+        box_heights = box_ys.max(axis=1) - box_ys.min(axis=1)
+        font_sizes = np.maximum(min_font_size, (box_heights * font_size_ratio).astype(int)).tolist()
+        pil_boxes = [[tuple(p) for p in box] for box in box_points.tolist()]
+        return pil_boxes, font_sizes
+
+    pil_boxes, font_sizes = [], []
+    for current_box in boxes:
+        # Ensure current_box points are tuples for Pillow
+        # And that they are valid numbers
+        try:
+            pil_box = [tuple(map(float, p)) for p in current_box]
+        except (ValueError, TypeError) as e:
+            print(f"Warning: Skipping invalid box data: {current_box}. Error: {e}")
+            pil_boxes.append(None)
+            font_sizes.append(min_font_size)
+            continue
+
+        # Calculate an approximate height of the box for font scaling
+        try:
+            box_height = max(p[1] for p in pil_box) - min(p[1] for p in pil_box)
+        except ValueError: # Handles empty pil_box if points were invalid
+            box_height = min_font_size / font_size_ratio # Fallback height
+
+        pil_boxes.append(pil_box)
+        font_sizes.append(max(min_font_size, int(box_height * font_size_ratio)))
+    return pil_boxes, font_sizes
+
+def _custom_draw_ocr_cv2(image, boxes, txts, scores, font_size_ratio, min_font_size,
+                         box_color, text_color, text_bg_color, box_thickness, text_margin):
+    """
+    OpenCV implementation of `custom_draw_ocr` (see its docstring for the arguments).
+    Draws on a BGR NumPy copy of the image and converts back to an RGB PIL Image.
+    """
+    import cv2 # Optional dependency, only needed for this backend
+
+    def to_bgr(color):
+        r, g, b = ImageColor.getrgb(color)[:3]
+        return (b, g, r)
+
+    box_bgr, text_bgr, text_bg_bgr = to_bgr(box_color), to_bgr(text_color), to_bgr(text_bg_color)
+    cv2_font = cv2.FONT_HERSHEY_SIMPLEX
+    cv2_img = np.asarray(image.convert('RGB'))[:, :, ::-1].copy()
+
+    pil_boxes, font_sizes = _prepare_box_geometry(boxes, font_size_ratio, min_font_size)
+    for i, pil_box in enumerate(pil_boxes):
+        if pil_box is None: # Invalid box data (already reported)
+            continue
+        pts = np.rint(np.asarray(pil_box)).astype(np.int32)
+        cv2.polylines(cv2_img, [pts], True, box_bgr, box_thickness)
+
+        display_text = f"{txts[i]} ({scores[i]:.2f})"
+        font_scale = cv2.getFontScaleFromHeight(cv2_font, font_sizes[i], 1)
+        (text_width, text_height), baseline = cv2.getTextSize(display_text, cv2_font, font_scale, 1)
+
+        # Text background sits above the first point of the box, as with the Pillow backend
+        text_anchor_x, text_anchor_y = int(pts[0][0]), int(pts[0][1])
+        bg_y1 = text_anchor_y - text_margin
+        bg_y0 = bg_y1 - text_height - baseline
+        cv2.rectangle(cv2_img, (text_anchor_x, bg_y0), (text_anchor_x + text_width, bg_y1), text_bg_bgr, -1)
+        cv2.putText(cv2_img, display_text, (text_anchor_x, bg_y1 - baseline), cv2_font, font_scale,
+                    text_bgr, 1, cv2.LINE_AA)
+
+    return Image.fromarray(cv2_img[:, :, ::-1])
+
 def custom_draw_ocr(image, boxes, txts, scores,
                     font_path=None,
                     default_font_name="arial.ttf", # A common font, change if needed
@@ -14,7 +195,9 @@ def custom_draw_ocr(image, boxes, txts, scores,
                     text_color='white',
                     text_bg_color='red',
                     box_thickness=2,
-                    text_margin=3): # Margin between box and text background
+                    text_margin=3, # Margin between box and text background
+                    backend='pil',
+                    inplace=False):
     """
     Draws OCR results (bounding boxes, text, scores) on a PIL Image with custom styling.
 
@@ -34,67 +217,52 @@ def custom_draw_ocr(image, boxes, txts, scores,
         text_bg_color (str, optional): Background color for the text.
         box_thickness (int, optional): Thickness of the bounding box lines.
         text_margin (int, optional): Margin between the top of the box and text background.
+        backend (str, optional): 'pil' (default) draws with Pillow and TrueType fonts.
+                                 'cv2' draws with OpenCV, which is faster for pages with
+                                 many boxes but renders text with OpenCV's built-in
+                                 Hershey font (ASCII only; font_path is ignored).
+        inplace (bool, optional): If True, draws directly on `image` instead of a copy
+                                  (Pillow backend only), for callers that do not need the
+                                  original image afterwards.
 
     Returns:
-        PIL.Image.Image: A new image with OCR results drawn.
+        PIL.Image.Image: A new image with OCR results drawn, or `image` itself if `inplace`.
     """
-    if not boxes: # If there are no boxes, return the original image
-        return image.copy()
+    if len(boxes) == 0: # If there are no boxes, return the original image
+        return image if inplace else image.copy()
+
+    if backend == 'cv2':
+        return _custom_draw_ocr_cv2(image, boxes, txts, scores, font_size_ratio, min_font_size,
+                                    box_color, text_color, text_bg_color, box_thickness, text_margin)
 
-    img_copy = image.copy()
+    img_copy = image if inplace else image.copy()
     draw = ImageDraw.Draw(img_copy)
 
+    # Precompute the geometry of all boxes at once: points as tuples for Pillow,
+    # and the font size derived from each box's height
+    pil_boxes, font_sizes = _prepare_box_geometry(boxes, font_size_ratio, min_font_size)
+
     for i in range(len(boxes)):
-        current_box = boxes[i] # List of 4 [x,y] points
+        pil_box = pil_boxes[i]
+        if pil_box is None: # Invalid box data (already reported)
+            continue
         current_text = txts[i]
         current_score = scores[i]
 
-        # Ensure current_box points are tuples for Pillow
-        # And that they are valid numbers
-        try:
-            pil_box = [tuple(map(float, p)) for p in current_box]
-        except (ValueError, TypeError) as e:
-            print(f"Warning: Skipping invalid box data: {current_box}. Error: {e}")
-            continue
-
         # Draw the bounding box polygon
         draw.polygon(pil_box, outline=box_color, width=box_thickness)
 
-        # Calculate an approximate height of the box for font scaling
-        try:
-            box_ymin = min(p[1] for p in pil_box)
-            box_ymax = max(p[1] for p in pil_box)
-            box_height = box_ymax - box_ymin
-        except ValueError: # Handles empty pil_box if points were invalid
-            box_height = min_font_size / font_size_ratio # Fallback height
-
-        font_size = max(min_font_size, int(box_height * font_size_ratio))
-
-        # Load font
-        font = None
-        if font_path:
-            try:
-                font = ImageFont.truetype(font_path, font_size)
-            except IOError:
-                print(f"Warning: Could not load font at {font_path}. Trying default.")
-        
-        if not font: # If font_path failed or was not provided
-            try:
-                font = ImageFont.truetype(default_font_name, font_size)
-            except IOError:
-                # print(f"Warning: Could not load default font {default_font_name}. Using Pillow's default.")
-                try:
-                    font = ImageFont.load_default(size=font_size) # Pillow 10+ allows size
-                except TypeError: # older Pillow
-                    font = ImageFont.load_default()
+        font_size = font_sizes[i]
 
+        # Load font (cached, so each TTF is opened once per size)
+        font = _load_ocr_font(font_path, default_font_name, font_size)
 
         display_text = f"{current_text} ({current_score:.2f})"
 
         # Get text bounding box relative to (0,0) to determine its width and height
         try:
             # font.getbbox is preferred for modern Pillow
-            text_bbox_at_origin = font.getbbox(display_text) # (left, top, right, bottom)
+            text_bbox_at_origin = _text_bbox(font, display_text) # (left, top, right, bottom)
             text_width = text_bbox_at_origin[2] - text_bbox_at_origin[0]
             text_height = text_bbox_at_origin[3] - text_bbox_at_origin[1]
             # text_offset_y_from_origin_top is the distance from the drawing y-coordinate to the top of the ink
@@ -136,7 +304,11 @@ def custom_draw_ocr(image, boxes, txts, scores,
 
     return img_copy
 
-def predict_and_visualize_ocr(image_path, lang='en', font_path=None, use_custom_draw=True):
+def predict_and_visualize_ocr(image_path, lang='en', font_path=None, use_custom_draw=True,
+                              use_gpu=False, enable_mkldnn=False, use_tensorrt=False,
+                              det_db_box_thresh=0.6, rec_batch_num=6, precision=None,
+                              det_model_dir=None, rec_model_dir=None, cls_model_dir=None,
+                              quantized=False, draw=True):
     """
     Performs OCR on an image using PaddleOCR, visualizes the bounding boxes, 
     and returns the annotated image along with OCR data.
@@ -150,85 +322,159 @@ def predict_and_visualize_ocr(image_path, lang='en', font_path=None, use_custom_
                                    Example: "arial.ttf" or "./simfang.ttf".
         use_custom_draw (bool, optional): If True, uses `custom_draw_ocr` for visualization.
                                           If False, uses PaddleOCR's built-in `draw_ocr`.
+        use_gpu (bool, optional): Run detection/recognition on the GPU (needs paddlepaddle-gpu).
+        enable_mkldnn (bool, optional): Use oneDNN (MKL-DNN) kernels for CPU inference.
+        use_tensorrt (bool, optional): Run the GPU models through TensorRT. Ignored on CPU. Needs the
+                                       TensorRT runtime, which paddlepaddle-gpu does not ship, and
+                                       selects FP16 unless `precision` is given (results can differ
+                                       slightly from FP32).
+        det_db_box_thresh (float, optional): Score threshold for detected text boxes.
+        rec_batch_num (int, optional): Number of text crops recognized per batch.
+        precision (str, optional): 'fp32', 'fp16' or 'int8'. If None, uses FP16 on the GPU
+                                   with TensorRT, INT8 on the CPU when `quantized` is True,
+                                   and FP32 otherwise.
+        det_model_dir, rec_model_dir, cls_model_dir (str, optional): Directories of custom
+                                   inference models (e.g. fine-tuned or PP-OCRv4 slim models).
+                                   None uses PaddleOCR's defaults.
+        quantized (bool, optional): The given model directories hold quantized (INT8, e.g.
+                                    PP-OCRv4 slim) models. On the CPU this enables oneDNN and
+                                    INT8 inference, unless `precision` is given.
+        draw (bool, optional): If False, skips drawing the results (e.g. when only the OCR data
+                               is needed); "image_annotated" is then None.
 
     Returns:
         dict: A dictionary containing:
             - "image_annotated" (PIL.Image.Image): Image with OCR results drawn, or None if an error.
             - "ocr_data" (list): Raw result from ocr_engine.ocr(), or None.
-            - "boxes" (list): List of bounding boxes, or None.
+            - "boxes" (np.ndarray): (N, 4, 2) float32 array of bounding boxes, or None.
             - "texts" (list): List of recognized texts, or None.
-            - "scores" (list): List of confidence scores, or None.
+            - "scores" (np.ndarray): (N,) float32 array of confidence scores, or None.
         Returns None for all values in dict if a major error occurs or no text is found.
     """
     print(f"Initializing PaddleOCR for language: {lang}...")
     try:
-        # Initialize PaddleOCR.
-        # - use_angle_cls=True: enable text angle classification.
-        # - lang: specify the language.
-        # - use_gpu=True/False: set to True if you installed paddlepaddle-gpu and have a GPU.
-        # - show_log=False: suppress verbose PaddleOCR logging.
-        ocr_engine = PaddleOCR(use_angle_cls=True, lang=lang, use_gpu=False, show_log=False)
+        # Get the (cached) PaddleOCR engine; only the first call per language loads models
+        ocr_engine = get_ocr_engine(lang, use_gpu=use_gpu, enable_mkldnn=enable_mkldnn,
+                                    use_tensorrt=use_tensorrt, det_db_box_thresh=det_db_box_thresh,
+                                    rec_batch_num=rec_batch_num, precision=precision,
+                                    det_model_dir=det_model_dir, rec_model_dir=rec_model_dir,
+                                    cls_model_dir=cls_model_dir, quantized=quantized)
         print(f"PaddleOCR initialized. Processing image: {image_path}")
+        return _ocr_and_visualize_image(ocr_engine, image_path, lang, font_path, use_custom_draw, draw)
 
-        if not os.path.exists(image_path):
-            print(f"Error: Image file not found at '{image_path}'")
-            return {
-                "image_annotated": None, "ocr_data": None, "boxes": None, 
-                "texts": None, "scores": None
-            }
-
-        # Perform OCR
-        ocr_raw_result = ocr_engine.ocr(image_path, cls=True)
-
-        if not ocr_raw_result or not ocr_raw_result[0]: # Check if result is None or empty
-            print(f"No text detected in '{image_path}' for language '{lang}'.")
-            return {
-                "image_annotated": None, "ocr_data": ocr_raw_result, "boxes": [], 
-                "texts": [], "scores": [] # Return empty lists for consistency
-            }
-        
+    except Exception as e:
+        print(f"An error occurred during OCR processing or visualization: {e}")
+        import traceback
+        traceback.print_exc()
+        return {
+            "image_annotated": None, "ocr_data": None, "boxes": None, 
+            "texts": None, "scores": None
+        }
+
+def predict_and_visualize_ocr_batch(image_paths, lang='en', font_path=None, use_custom_draw=True,
+                                    use_gpu=False, enable_mkldnn=False, use_tensorrt=False,
+                                    det_db_box_thresh=0.6, rec_batch_num=30, precision=None,
+                                    det_model_dir=None, rec_model_dir=None, cls_model_dir=None,
+                                    quantized=False, draw=True):
+    """
+    Performs OCR and visualization on several images with a single PaddleOCR engine.
+
+    The engine is set up once for all images, and recognition runs with a larger batch
+    size (`rec_batch_num`) so each forward pass covers more text crops. PaddleOCR runs
+    detection on one image per call, so the images are passed to the engine one by one.
+
+    Args:
+        image_paths (list): Paths to the input images.
+        Other arguments are as in `predict_and_visualize_ocr`.
+
+    Returns:
+        list: One result dict (as returned by `predict_and_visualize_ocr`) per image, in
+              the order of `image_paths`.
+    """
+    print(f"Initializing PaddleOCR for language: {lang}...")
+    try:
+        ocr_engine = get_ocr_engine(lang, use_gpu=use_gpu, enable_mkldnn=enable_mkldnn,
+                                    use_tensorrt=use_tensorrt, det_db_box_thresh=det_db_box_thresh,
+                                    rec_batch_num=rec_batch_num, precision=precision,
+                                    det_model_dir=det_model_dir, rec_model_dir=rec_model_dir,
+                                    cls_model_dir=cls_model_dir, quantized=quantized)
+    except Exception as e:
+        print(f"An error occurred while initializing PaddleOCR: {e}")
+        return [{"image_annotated": None, "ocr_data": None, "boxes": None,
+                 "texts": None, "scores": None} for _ in image_paths]
+    print(f"PaddleOCR initialized. Processing {len(image_paths)} images.")
+
+    results = []
+    for image_path in image_paths:
+        try:
+            results.append(_ocr_and_visualize_image(ocr_engine, image_path, lang, font_path,
+                                                    use_custom_draw, draw))
+        except Exception as e: # One failing image does not stop the rest of the batch
+            print(f"An error occurred during OCR processing or visualization of '{image_path}': {e}")
+            results.append({"image_annotated": None, "ocr_data": None, "boxes": None,
+                            "texts": None, "scores": None})
+    return results
+
+def _ocr_and_visualize_image(ocr_engine, image_path, lang, font_path, use_custom_draw, draw=True):
+    """
+    Runs `ocr_engine` on one image and draws the results; the work shared by
+    `predict_and_visualize_ocr` and `predict_and_visualize_ocr_batch`.
+    """
+    if not os.path.exists(image_path):
+        print(f"Error: Image file not found at '{image_path}'")
+        return {
+            "image_annotated": None, "ocr_data": None, "boxes": None, 
+            "texts": None, "scores": None
+        }
+
+    # Perform OCR
+    ocr_raw_result = ocr_engine.ocr(image_path, cls=True)
+
+    if not ocr_raw_result or not ocr_raw_result[0]: # Check if result is None or empty
+        print(f"No text detected in '{image_path}' for language '{lang}'.")
+        return {
+            "image_annotated": None, "ocr_data": ocr_raw_result, "boxes": [], 
+            "texts": [], "scores": [] # Return empty lists for consistency
+        }
+    
+    # Extract data for visualization
+    # ocr_raw_result is a list of lists, e.g. [[[points, (text, confidence)], ...]]
+    # For a single image, we take the first element ocr_raw_result[0]
+    # Boxes and scores are kept as contiguous arrays (PaddleOCR produces float32 values,
+    # so this is lossless) and passed as-is to the layout analysis.
+    lines = ocr_raw_result[0]
+    boxes = np.asarray([line[0] for line in lines], dtype=np.float32) # (N, 4, 2)
+    txts = [line[1][0] for line in lines]
+    scores = np.asarray([line[1][1] for line in lines], dtype=np.float32) # (N,)
+
+    annotated_image = None
+    if not draw:
+        print(f"Text detected. Skipping visualization.")
+    else:
         print(f"Text detected. Visualizing results...")
 
         # Load the original image using Pillow
         image = Image.open(image_path).convert('RGB')
 
-        # Extract data for visualization
-        # ocr_raw_result is a list of lists, e.g. [[[points, (text, confidence)], ...]]
-        # For a single image, we take the first element ocr_raw_result[0]
-        lines = ocr_raw_result[0]
-        boxes = [line[0] for line in lines]
-        txts = [line[1][0] for line in lines]
-        scores = [line[1][1] for line in lines]
-
-        annotated_image = None
         if use_custom_draw:
-            # Use the enhanced custom_draw_ocr function
-            annotated_image = custom_draw_ocr(image, boxes, txts, scores, font_path=font_path)
+            # Use the enhanced custom_draw_ocr function; the freshly loaded image is not needed
+            # afterwards, so it is drawn on directly
+            annotated_image = custom_draw_ocr(image, boxes, txts, scores, font_path=font_path, inplace=True)
         else:
             # Use PaddleOCR's built-in draw_ocr (less customizable text rendering)
             # Note: PaddleOCR's draw_ocr might require the font path to be accessible by its internal logic.
             # It typically defaults to 'simfang.ttf' if font_path is None or not found.
-            from paddleocr import draw_ocr # Import locally if only used here
-            annotated_image = draw_ocr(image, boxes, txts, scores, font_path=font_path)
-        
-        results_dict = {
-            "image_annotated": annotated_image,
-            "ocr_data": ocr_raw_result, # Full raw result
-            "boxes": boxes,
-            "texts": txts,
-            "scores": scores
-        }
-        print("OCR and visualization complete.")
-        return results_dict
-
-    except Exception as e:
-        print(f"An error occurred during OCR processing or visualization: {e}")
-        import traceback
-        traceback.print_exc()
-        return {
-            "image_annotated": None, "ocr_data": None, "boxes": None, 
-            "texts": None, "scores": None
-        }
+            annotated_image = _paddle_mod().draw_ocr(image, boxes, txts, scores, font_path=font_path)
+    
+    results_dict = {
+        "image_annotated": annotated_image,
+        "ocr_data": ocr_raw_result, # Full raw result
+        "boxes": boxes,
+        "texts": txts,
+        "scores": scores
+    }
+    print("OCR and visualization complete." if draw else "OCR complete.")
+    return results_dict
 
 if __name__ == '__main__':
     print("Testing ocr_utils.py...")
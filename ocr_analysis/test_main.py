@@ -0,0 +1,59 @@
+# Tests for the page dispatch in main.py. OCR and layout work are replaced by mocks,
+# so these run without PaddleOCR. Run with: python -m unittest test_main (from ocr_analysis/)
+
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import main
+
+
+class MainMultiPageTest(unittest.TestCase):
+
+    def test_cpu_path_passes_each_page_its_output_dir(self):
+        image_paths = ["docs/page1.jpg", "docs/page2.jpg", "docs/page3.jpg"]
+        # Threads stand in for worker processes, so the mocks below are seen by the workers
+        with mock.patch.object(main, "ProcessPoolExecutor", ThreadPoolExecutor), \
+             mock.patch.object(main, "_paddle_compiled_with_cuda", return_value=False), \
+             mock.patch.object(main, "get_ocr_engine") as get_ocr_engine, \
+             mock.patch.object(main, "process_one", autospec=True) as process_one:
+            main.main(image_paths, max_workers=2)
+
+        get_ocr_engine.assert_called()
+        self.assertEqual(process_one.call_count, len(image_paths))
+        output_dirs = {call.args[0]: call.kwargs["output_dir"] for call in process_one.call_args_list}
+        self.assertEqual(output_dirs, {
+            path: os.path.join("output/document_layouts", os.path.splitext(os.path.basename(path))[0])
+            for path in image_paths
+        })
+        for call in process_one.call_args_list:
+            self.assertIsInstance(call.args[1], dict) # layout_params
+
+    def test_cpu_path_default_worker_count_is_capped(self):
+        worker_counts = []
+
+        def executor(max_workers=None, **kwargs):
+            worker_counts.append(max_workers)
+            return ThreadPoolExecutor(max_workers=max_workers, **kwargs)
+
+        for num_pages, cpu_count, expected in [(2, 64, 2), (8, 64, main.MAX_DEFAULT_OCR_WORKERS), (8, 8, 1)]:
+            with mock.patch.object(main, "ProcessPoolExecutor", executor), \
+                 mock.patch.object(main.os, "cpu_count", return_value=cpu_count), \
+                 mock.patch.object(main, "_paddle_compiled_with_cuda", return_value=False), \
+                 mock.patch.object(main, "get_ocr_engine"), \
+                 mock.patch.object(main, "process_one", autospec=True):
+                main.main([f"docs/page{i}.jpg" for i in range(num_pages)])
+            self.assertEqual(worker_counts[-1], expected)
+
+    def test_cpu_path_reraises_worker_errors(self):
+        with mock.patch.object(main, "ProcessPoolExecutor", ThreadPoolExecutor), \
+             mock.patch.object(main, "_paddle_compiled_with_cuda", return_value=False), \
+             mock.patch.object(main, "get_ocr_engine"), \
+             mock.patch.object(main, "process_one", autospec=True, side_effect=RuntimeError("page failed")):
+            with self.assertRaises(RuntimeError):
+                main.main(["docs/page1.jpg", "docs/page2.jpg"], max_workers=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,8 +3,167 @@
 # understanding the output of the layout analysis process.
 
 from PIL import Image, ImageDraw, ImageFont
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import math
+import numpy as np
 import os
 
+@lru_cache(maxsize=32)
+def _load_font(path, size):
+    """
+    Loads a TrueType font (Arial if `path` is None), falling back to Pillow's default font.
+    Cached, so each (path, size) is parsed from disk once across stages and pages.
+    """
+    resolved_font_path = path if path else "arial.ttf" # Default to Arial
+    try:
+        return ImageFont.truetype(resolved_font_path, size)
+    except IOError:
+        # print(f"Warning: Font '{resolved_font_path}' not found. Using Pillow's default.")
+        try:
+            return ImageFont.load_default(size=size) # Pillow 10+
+        except TypeError:
+            return ImageFont.load_default()
+
+def _classify_boxes(boxes_to_draw):
+    """
+    Splits boxes into polygons and axis-aligned rectangles and converts their coordinates to floats.
+    Uniform input ((N, P, 2) polygons or (N, 4) rectangles) is converted with a single NumPy
+    call; mixed or ragged input falls back to checking each box.
+
+    Returns:
+        tuple: (kinds, coords). kinds[i] is 'polygon', 'rect' or None (box skipped);
+               coords[i] is a list of [x, y] points or [xmin, ymin, xmax, ymax].
+    """
+    num_boxes = len(boxes_to_draw)
+    try:
+        boxes_np = np.asarray(boxes_to_draw, dtype=np.float64)
+    except (ValueError, TypeError): # Ragged, mixed or non-numeric boxes
+        boxes_np = None
+
+    if boxes_np is not None and num_boxes and boxes_np.ndim == 3 and boxes_np.shape[2] == 2:
+        kind = 'polygon' if boxes_np.shape[1] > 0 else None
+        return [kind] * num_boxes, boxes_np.tolist()
+    if boxes_np is not None and num_boxes and boxes_np.ndim == 2 and boxes_np.shape[1] == 4:
+        return ['rect'] * num_boxes, boxes_np.tolist()
+
+    kinds, coords = [], []
+    for box_item in boxes_to_draw:
+        kind, box_coords = None, None
+        try:
+            if len(box_item) == 0: # Skip if box_item is empty
+                pass
+            # Check if it's a polygon (list of points)
+            elif isinstance(box_item[0], (list, tuple, np.ndarray)) and len(box_item[0]) == 2:
+                # Ensure coordinates are float for drawing
+                kind, box_coords = 'polygon', [[float(p[0]), float(p[1])] for p in box_item]
+            # Check if it's an axis-aligned rectangle [xmin, ymin, xmax, ymax]
+            elif len(box_item) == 4:
+                kind, box_coords = 'rect', [float(c) for c in box_item]
+            # else:
+                # print(f"Warning: Skipping unrecognized box format: {box_item}")
+        except (TypeError, ValueError, IndexError) as e:
+            # print(f"Warning: Error drawing box {box_item}: {e}")
+            kind, box_coords = None, None
+        kinds.append(kind)
+        coords.append(box_coords)
+    return kinds, coords
+
+
+def _rejected_by_pillow(kind, coords):
+    """
+    True if ImageDraw would raise on this classified box: a rectangle with xmax < xmin or
+    ymax < ymin, or a polygon with fewer than 2 points ([x, y] pairs or a flat list).
+    """
+    if kind == 'rect':
+        return coords[2] < coords[0] or coords[3] < coords[1]
+    num_points = len(coords) // 2 if coords and not isinstance(coords[0], list) else len(coords)
+    return num_points < 2
+
+
+def _box_bounds(box_kinds, box_coords):
+    """
+    Returns the (N, 4) bounds [xmin, ymin, xmax, ymax] of classified boxes (NaN for skipped boxes).
+    Uniform boxes are handled with one NumPy conversion.
+    """
+    if box_kinds[0] is not None and box_kinds.count(box_kinds[0]) == len(box_kinds):
+        try:
+            boxes_np = np.asarray(box_coords, dtype=np.float64)
+        except ValueError: # Polygons with different numbers of points
+            boxes_np = None
+        if boxes_np is not None and box_kinds[0] == 'rect':
+            return boxes_np
+        if boxes_np is not None:
+            return np.concatenate([boxes_np.min(axis=1), boxes_np.max(axis=1)], axis=1)
+
+    bounds = np.full((len(box_kinds), 4), np.nan)
+    for i, (kind, coords) in enumerate(zip(box_kinds, box_coords)):
+        if kind == 'polygon':
+            points = np.asarray(coords)
+            bounds[i, :2], bounds[i, 2:] = points.min(axis=0), points.max(axis=0)
+        elif kind == 'rect':
+            bounds[i] = coords
+    return bounds
+
+
+def _boxes_in_view(bounds, clip_size, margin):
+    """
+    Returns an (N,) mask of the boxes whose bounds, grown by `margin` pixels for the outline
+    width and coordinate rounding, intersect the (width, height) image. NaN bounds count as in view.
+    """
+    img_w, img_h = clip_size
+    outside = ((bounds[:, 2] < -margin) | (bounds[:, 3] < -margin) |
+               (bounds[:, 0] >= img_w + margin) | (bounds[:, 1] >= img_h + margin))
+    return ~outside
+
+
+def _resolve_text_labels(labels, num_boxes):
+    """Returns the label text of each box, or None if no labels are drawn."""
+    if labels is True: # Auto-number if labels is True
+        return [str(i) for i in range(num_boxes)]
+    if isinstance(labels, list) and labels:
+        text_labels = [str(label) for label in labels[:num_boxes]]
+        return text_labels + [""] * (num_boxes - len(text_labels))
+    return None
+
+
+def _draw_thick_polygon_outline(image, flat_coords, color, width):
+    """
+    Draws a polygon outline wider than 1 pixel on a crop around the polygon and pastes it back.
+    Pillow draws such outlines through a fill mask the size of the whole image, so drawing them
+    directly costs a full-page mask per polygon; on the crop the mask is only the polygon's size.
+    The polygon is moved by whole pixels into the crop, so the pixels are the same in practice
+    (rarely, a self-intersecting polygon can differ by a pixel at a corner).
+    """
+    xs, ys = flat_coords[0::2], flat_coords[1::2]
+    margin = width + 2 # Room for the outline and rounding
+    x0, y0 = math.floor(min(xs)) - margin, math.floor(min(ys)) - margin
+    x1, y1 = math.ceil(max(xs)) + margin + 1, math.ceil(max(ys)) + margin + 1
+    region = image.crop((x0, y0, x1, y1))
+    shifted = [v - x0 if i % 2 == 0 else v - y0 for i, v in enumerate(flat_coords)]
+    ImageDraw.Draw(region).polygon(shifted, outline=color, width=width)
+    image.paste(region, (x0, y0))
+
+
+def _draw_box_outline(image, draw, kind, coords, color, thickness):
+    """Draws one classified box with Pillow. Returns False if the box could not be drawn."""
+    try:
+        if kind == 'polygon': # List of [x, y] points, or a flat [x0, y0, x1, y1, ...] list
+            flat_coords = coords if not coords or not isinstance(coords[0], list) else [v for p in coords for v in p]
+            # Wide outlines are drawn on a crop; negative coordinates round differently, so those
+            # polygons (only near the top or left edge) are drawn directly
+            if thickness > 1 and len(flat_coords) >= 6 and min(flat_coords) >= 0:
+                _draw_thick_polygon_outline(image, flat_coords, color, thickness)
+            else:
+                draw.polygon(coords, outline=color, width=thickness)
+        else: # Axis-aligned rectangle [xmin, ymin, xmax, ymax]
+            draw.rectangle(coords, outline=color, width=thickness)
+    except (TypeError, ValueError, IndexError) as e:
+        # print(f"Warning: Error drawing box {coords}: {e}")
+        return False
+    return True
+
+
 def draw_boxes_on_image_direct(
     base_image_to_draw_on, # Should be a PIL Image object
     boxes_to_draw,         # List of boxes (either polygon or AA rect [xmin,ymin,xmax,ymax])
@@ -12,7 +171,10 @@ def draw_boxes_on_image_direct(
     thickness=2,
     labels=None,           # Can be True (auto-number), or a list of strings, or None
     font_path=None,
-    label_font_size=15
+    label_font_size=15,
+    font=None,             # Already loaded label font; overrides font_path
+    draw=None,             # Existing ImageDraw.Draw of base_image_to_draw_on to reuse
+    clip_size=None         # (width, height) of the image: boxes outside it are skipped
 ):
     """
     Draws a list of boxes (polygons or rectangles) onto a PIL Image object.
@@ -22,7 +184,8 @@ def draw_boxes_on_image_direct(
         base_image_to_draw_on (PIL.Image.Image): The image to draw on.
         boxes_to_draw (list): List of boxes. Each box can be a polygon
                               (list of [x,y] points) or an AA rectangle
-                              ([xmin, ymin, xmax, ymax]).
+                              ([xmin, ymin, xmax, ymax]). An (N, P, 2) polygon
+                              array is drawn by `draw_polygons_ndarray`.
         color (str or tuple): Color for the box outlines and labels.
         thickness (int): Thickness of the box lines.
         labels (bool, list, optional): If True, labels boxes with their index.
@@ -30,67 +193,266 @@ def draw_boxes_on_image_direct(
                                        If None, no labels are drawn.
         font_path (str, optional): Path to a .ttf font file for labels.
         label_font_size (int): Font size for labels.
+        font (ImageFont, optional): Already loaded label font, used instead of loading
+                                    `font_path` at `label_font_size`.
+        draw (ImageDraw.ImageDraw, optional): Drawing context of `base_image_to_draw_on`,
+                                              reused instead of creating a new one.
+        clip_size (tuple, optional): (width, height) of the image. Outlines of boxes whose
+                                     bounding box lies entirely outside it are not sent to
+                                     Pillow; their labels are still drawn, as they can reach
+                                     into the image.
 
     Returns:
         PIL.Image.Image: The image with boxes drawn (modified in place).
     """
-    draw = ImageDraw.Draw(base_image_to_draw_on) # Draw directly on the passed image
-    label_font = None
-    if labels: # If labels are requested (True or a list)
-        resolved_font_path = font_path if font_path else "arial.ttf" # Default to Arial
-        try:
-            label_font = ImageFont.truetype(resolved_font_path, label_font_size)
-        except IOError:
-            # print(f"Warning: Font '{resolved_font_path}' not found. Using Pillow's default for labels.")
+    if isinstance(boxes_to_draw, np.ndarray) and boxes_to_draw.ndim == 3 and boxes_to_draw.shape[2] == 2:
+        return draw_polygons_ndarray(base_image_to_draw_on, boxes_to_draw, color, thickness, labels,
+                                     font_path, label_font_size, font, draw, clip_size)
+
+    if draw is None:
+        draw = ImageDraw.Draw(base_image_to_draw_on) # Draw directly on the passed image
+
+    # Classify and convert all boxes up front (one NumPy conversion when the boxes are uniform)
+    box_kinds, box_coords = _classify_boxes(boxes_to_draw)
+
+    text_labels = _resolve_text_labels(labels, len(box_kinds)) # Once, outside the drawing loops
+
+    # Outlines entirely outside the image are not sent to Pillow (their labels may still show)
+    outline_in_view = [True] * len(box_kinds)
+    if clip_size is not None and box_kinds:
+        outline_in_view = _boxes_in_view(_box_bounds(box_kinds, box_coords), clip_size, thickness + 1).tolist()
+
+    if text_labels is None: # No labels: outlines only, and no label font is loaded
+        for kind, coords, in_view in zip(box_kinds, box_coords, outline_in_view):
+            if kind is not None and in_view: # Skip empty, invalid, unrecognized or off-image boxes
+                _draw_box_outline(base_image_to_draw_on, draw, kind, coords, color, thickness)
+        return base_image_to_draw_on
+
+    label_font = font if font is not None else _load_font(font_path, label_font_size)
+    label_y_offset = label_font_size + 5 # Labels sit this far above the box, clamped to the top edge
+    for i, (kind, coords) in enumerate(zip(box_kinds, box_coords)):
+        if kind is None: continue # Skip empty, invalid or unrecognized boxes
+        if not outline_in_view[i]:
+            if _rejected_by_pillow(kind, coords):
+                continue # Not drawn, so it gets no label (as if Pillow had raised)
+        elif not _draw_box_outline(base_image_to_draw_on, draw, kind, coords, color, thickness):
+            continue
+
+        text_label = text_labels[i]
+        if text_label and label_font:
+            # Position label near the first point of the polygon or the top-left corner
+            # of the rectangle, slightly above (but not above the image)
+            x, y = coords[0] if kind == 'polygon' else coords[:2]
             try:
-                label_font = ImageFont.load_default(size=label_font_size) # Pillow 10+
-            except TypeError:
-                label_font = ImageFont.load_default()
+                draw.text((x, max(0, y - label_y_offset)), text_label, fill=color, font=label_font)
+            except (TypeError, ValueError, IndexError) as e:
+                pass # Continue to the next box
+    return base_image_to_draw_on
 
 
-    for i, box_item in enumerate(boxes_to_draw):
-        if not box_item: continue # Skip if box_item is None or empty
+def draw_polygons_ndarray(
+    base_image_to_draw_on, # Should be a PIL Image object
+    polygons,              # (N, P, 2) array of polygon points
+    color,
+    thickness=2,
+    labels=None,           # Can be True (auto-number), or a list of strings, or None
+    font_path=None,
+    label_font_size=15,
+    font=None,             # Already loaded label font; overrides font_path
+    draw=None,             # Existing ImageDraw.Draw of base_image_to_draw_on to reuse
+    clip_size=None         # (width, height) of the image: boxes outside it are skipped
+):
+    """
+    Same as `draw_boxes_on_image_direct` for polygons held in one NumPy array, such as the
+    (N, 4, 2) float32 boxes from PaddleOCR. Each polygon goes to Pillow as a flat
+    [x0, y0, x1, y1, ...] list taken from the array, without building nested [x, y] lists.
+    `draw` optionally passes an existing drawing context of the image, and outlines of polygons
+    entirely outside `clip_size` (width, height) are skipped (their labels are still drawn).
 
-        text_label = ""
-        if isinstance(labels, list) and i < len(labels):
-            text_label = str(labels[i])
-        elif labels is True: # Auto-number if labels is True
-            text_label = str(i)
+    Returns:
+        PIL.Image.Image: The image with polygons drawn (modified in place).
+    """
+    polygons = np.asarray(polygons)
+    num_polygons = polygons.shape[0]
+    if num_polygons == 0 or polygons.shape[1] == 0: # Nothing to draw
+        return base_image_to_draw_on
+    if draw is None:
+        draw = ImageDraw.Draw(base_image_to_draw_on) # Draw directly on the passed image
+    flat_polygons = polygons.reshape(num_polygons, -1).tolist()
+    text_labels = _resolve_text_labels(labels, num_polygons)
 
-        try:
-            # Check if it's a polygon (list of points)
-            if isinstance(box_item[0], (list, tuple)) and len(box_item[0]) == 2:
-                # Ensure coordinates are float for drawing
-                poly_box_coords = [(float(p[0]), float(p[1])) for p in box_item]
-                draw.polygon(poly_box_coords, outline=color, width=thickness)
-                if text_label and label_font:
-                    # Position label near the first point of the polygon, slightly above
-                    draw.text((poly_box_coords[0][0], poly_box_coords[0][1] - (label_font_size + 5)),
-                              text_label, fill=color, font=label_font)
-            # Check if it's an axis-aligned rectangle [xmin, ymin, xmax, ymax]
-            elif len(box_item) == 4:
-                xmin, ymin, xmax, ymax = [float(c) for c in box_item]
-                draw.rectangle([xmin, ymin, xmax, ymax], outline=color, width=thickness)
-                if text_label and label_font:
-                    # Position label near the top-left corner, slightly above
-                    draw.text((xmin, ymin - (label_font_size + 5)),
-                              text_label, fill=color, font=label_font)
-            # else:
-                # print(f"Warning: Skipping unrecognized box format: {box_item}")
-        except (TypeError, ValueError, IndexError) as e:
-            # print(f"Warning: Error drawing box {box_item}: {e}")
-            pass # Continue to the next box
+    # Outlines entirely outside the image are not sent to Pillow (their labels may still show)
+    outline_in_view = [True] * num_polygons
+    if clip_size is not None:
+        outline_in_view = _boxes_in_view(np.concatenate([polygons.min(axis=1), polygons.max(axis=1)], axis=1),
+                                         clip_size, thickness + 1).tolist()
+
+    if text_labels is None: # No labels: outlines only, and no label font is loaded
+        for coords, in_view in zip(flat_polygons, outline_in_view):
+            if in_view:
+                _draw_box_outline(base_image_to_draw_on, draw, 'polygon', coords, color, thickness)
+        return base_image_to_draw_on
+
+    label_font = font if font is not None else _load_font(font_path, label_font_size)
+    label_y_offset = label_font_size + 5 # Labels sit this far above the box, clamped to the top edge
+    for coords, text_label, in_view in zip(flat_polygons, text_labels, outline_in_view):
+        if not in_view:
+            if _rejected_by_pillow('polygon', coords):
+                continue # Not drawn, so it gets no label (as if Pillow had raised)
+        elif not _draw_box_outline(base_image_to_draw_on, draw, 'polygon', coords, color, thickness):
+            continue
+        if text_label and label_font:
+            # Position label near the first point of the polygon, slightly above (but not above the image)
+            try:
+                draw.text((coords[0], max(0, coords[1] - label_y_offset)), text_label, fill=color, font=label_font)
+            except (TypeError, ValueError, IndexError) as e:
+                pass # Continue to the next polygon
     return base_image_to_draw_on
 
 
+def _blend_column_fills(image_rgb, columns, fill_colors_rgba, draw_outlines=True):
+    """
+    Blends semi-transparent, full-height column rectangles into an opaque RGB image in place,
+    with NumPy on the image array instead of compositing a full-size RGBA layer.
+
+    Column i gets fill_colors_rgba[i % len(fill_colors_rgba)] and, if `draw_outlines`, a
+    1-pixel outline at half that color. Where columns overlap, the later column wins.
+    The result is pixel-identical to alpha-compositing those rectangles from one layer.
+    """
+    img_w, img_h = image_rgb.size
+    # A full-height rectangle looks the same on every row except its top outline row, so the
+    # layer only needs two rows: row 0 (top outline) and row 1 (every other row)
+    layer_rows = Image.new('RGBA', (img_w, 2), (0,0,0,0))
+    draw_layer = ImageDraw.Draw(layer_rows)
+    for i, (cx1, cx2) in enumerate(columns):
+        fill_color_rgba = fill_colors_rgba[i % len(fill_colors_rgba)]
+        outline_color_rgb = tuple(c // 2 for c in fill_color_rgba[:3]) if draw_outlines else None # Darker outline
+        draw_layer.rectangle([cx1, 0, cx2, img_h], fill=fill_color_rgba, outline=outline_color_rgb, width=1)
+    layer_rows = np.asarray(layer_rows)
+
+    covered_x = np.flatnonzero(layer_rows[:, :, 3].any(axis=0))
+    if covered_x.size == 0:
+        return
+    x0, x1 = int(covered_x[0]), int(covered_x[-1]) + 1 # Only the covered slice of the page is blended
+
+    # The layer holds only a few distinct colors (one fill and one outline per column), so every
+    # blend result is looked up in a small table: lut[style, channel, destination value], filled
+    # with the same integer arithmetic as Image.alpha_composite over an opaque destination
+    styles, style_ids = np.unique(layer_rows[:, x0:x1].reshape(-1, 4), axis=0, return_inverse=True)
+    styles = styles.astype(np.uint32)
+    dst_values = np.arange(256, dtype=np.uint32)
+    src_a = styles[:, 3, None, None]
+    blended = (styles[:, :3, None] * src_a + dst_values * (255 - src_a)) * 128 + 16384
+    lut = ((((blended >> 8) + blended) >> 8) >> 7).astype(np.uint8).ravel()
+    # Offset of each layer pixel's (style, channel) row in the flat table: (2, x1 - x0, 3)
+    lut_offsets = (style_ids.reshape(2, -1, 1) * 3 + np.arange(3)) * 256
+
+    arr = np.array(image_rgb.crop((x0, 0, x1, img_h))) # Writable (H, x1 - x0, 3) copy of the slice
+    arr[0] = lut[lut_offsets[0] + arr[0]] # Row 0 of the page uses the outline row
+    # Every other row uses layer row 1, in bands of rows to bound the size of the index temporaries
+    for y0 in range(1, img_h, 256):
+        y1 = min(y0 + 256, img_h)
+        arr[y0:y1] = lut[lut_offsets[1] + arr[y0:y1]]
+    image_rgb.paste(Image.fromarray(arr), (x0, 0))
+
+
+def _scale_boxes(boxes, scale):
+    """
+    Scales box coordinates (polygons or rectangles) by `scale`. Uniform boxes are scaled as one
+    float64 array; ragged or mixed boxes one by one, leaving boxes that are not numeric as they are.
+    """
+    try:
+        return np.asarray(boxes, dtype=np.float64) * scale
+    except (ValueError, TypeError): # Ragged, mixed or non-numeric boxes
+        pass
+    scaled_boxes = []
+    for box_item in boxes:
+        try:
+            scaled_boxes.append(np.asarray(box_item, dtype=np.float64) * scale)
+        except (ValueError, TypeError):
+            scaled_boxes.append(box_item) # Skipped when drawing
+    return scaled_boxes
+
+
+# Free page-sized stage buffers, by (width, height, mode). Pages of one size reuse the same
+# buffers across calls instead of allocating (and first-touching) new full-page images.
+# Pooled buffers stay allocated between calls: at most _BUFFER_POOL_MAX buffers and
+# _BUFFER_POOL_MAX_BYTES in total (e.g. 4 RGB buffers of a 2500x3300 page, ~33 MB each).
+# Call clear_buffer_pool() to free them once no more pages will be visualized.
+_buffer_pool = {}
+_BUFFER_POOL_MAX = 5 # Free buffers kept per size: one per stage
+_BUFFER_POOL_MAX_BYTES = 128 * 1024 * 1024
+
+
+def _buffer_nbytes(image):
+    """Approximate memory of an image: Pillow stores multi-band pixels in 4 bytes."""
+    return image.width * image.height * (1 if len(image.getbands()) == 1 else 4)
+
+
+def _acquire_buffer(size, mode):
+    """Returns a free pooled image of this size and mode (with stale content), or a new one."""
+    try:
+        return _buffer_pool[(size[0], size[1], mode)].pop()
+    except (KeyError, IndexError):
+        return Image.new(mode, size)
+
+
+def _release_buffer(image):
+    """
+    Returns a stage buffer to the pool, or lets it be freed if the pool is full.
+    Only buffers of the latest page size are kept.
+    """
+    key = (image.width, image.height, image.mode)
+    if key not in _buffer_pool:
+        _buffer_pool.clear()
+    free_buffers = _buffer_pool.setdefault(key, [])
+    if len(free_buffers) < _BUFFER_POOL_MAX and \
+            (len(free_buffers) + 1) * _buffer_nbytes(image) <= _BUFFER_POOL_MAX_BYTES:
+        free_buffers.append(image)
+
+
+def clear_buffer_pool():
+    """Frees the stage buffers kept for reuse by `visualize_layout_stages_on_image`."""
+    _buffer_pool.clear()
+
+
+@lru_cache(maxsize=64)
+def _render_text_mask(text, font):
+    """
+    Rasterizes `text` once into a tight 'L' coverage mask and returns (mask, (left, top)),
+    where (left, top) is the mask's offset from the text position. Pasting a solid color
+    through the mask at position + offset gives the same pixels as ImageDraw.text.
+    Cached, so each title is rendered by FreeType once across stages and pages.
+    """
+    left, top, right, bottom = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), text, font=font)
+    mask = Image.new('L', (max(1, right - left), max(1, bottom - top)), 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font)
+    return mask, (left, top)
+
+
+def _save_stage_image(image, output_dir, name, output_format='png', png_compress_level=1):
+    """Saves one stage image as `<output_dir>/<name>.png` or `.jpg` and returns its path."""
+    if output_format.lower() in ('jpg', 'jpeg'):
+        path = os.path.join(output_dir, f"{name}.jpg")
+        image.save(path, 'JPEG', quality=85, optimize=False)
+    else:
+        path = os.path.join(output_dir, f"{name}.png")
+        image.save(path, compress_level=png_compress_level, optimize=False)
+    return path
+
+
 def visualize_layout_stages_on_image(
     image_path,             # Path to the original image
-    initial_ocr_results,    # List of (polygon_box, (text, score)) from OCR
+    initial_ocr_results,    # List of (polygon_box, (text, score)) from OCR, or an (N, 4, 2) box array
     full_length_single_col_rows, # AA boxes [xmin,ymin,xmax,ymax]
     spanning_row_boxes,        # AA boxes
     identified_cols,           # List of (col_xmin, col_xmax)
     output_dir="layout_visualization_on_image",
-    base_font_path=None     # e.g., "arial.ttf" or path to specific .ttf
+    base_font_path=None,    # e.g., "arial.ttf" or path to specific .ttf
+    png_compress_level=1,   # zlib level for the stage PNGs (1 = fastest, 9 = smallest)
+    output_format='png',    # 'png' or 'jpg'
+    max_dim=None,           # e.g. 1600: downscale larger pages so their longer side is max_dim pixels
+    max_workers=None        # Threads rendering the stages (default: one per stage)
 ):
     """
     Generates and saves a series of images visualizing the different stages
@@ -98,13 +460,28 @@ def visualize_layout_stages_on_image(
 
     Args:
         image_path (str): Path to the original source image.
-        initial_ocr_results (list): OCR results as [(poly_box, (text, score)), ...].
+        initial_ocr_results (list or np.ndarray): OCR results as [(poly_box, (text, score)), ...],
+                                    or just the polygon boxes as an (N, 4, 2) array.
                                     Used to draw initial text boxes.
         full_length_single_col_rows (list): AA boxes for rows within columns.
         spanning_row_boxes (list): AA boxes for rows that span columns.
         identified_cols (list): Tuples (col_xmin, col_xmax) for identified columns.
         output_dir (str): Directory to save the visualization images.
         base_font_path (str, optional): Path to a .ttf font file for titles/labels.
+        png_compress_level (int): zlib compression level (0-9) of the saved PNGs. These are
+                                  debugging images, so the default favors encoding speed
+                                  over file size (Pillow's default is 6).
+        output_format (str): 'png' (lossless) or 'jpg'. JPEG (quality 85) encodes faster
+                             and gives much smaller files for scanned pages.
+        max_dim (int, optional): If set, pages whose width or height exceeds it are drawn
+                                 downscaled to fit, with all boxes and columns scaled to match.
+                                 A 300 DPI page is much larger than a debugging image needs.
+        max_workers (int, optional): Number of threads rendering and saving the stages in
+                                     parallel. Defaults to one thread per stage; 1 renders
+                                     them one after another.
+
+    The page-sized stage buffers are kept (up to 128 MB) for the next call; `clear_buffer_pool()`
+    frees them.
     """
     if not os.path.exists(image_path):
         print(f"Error: Image path not found for visualization: {image_path}")
@@ -113,118 +490,100 @@ def visualize_layout_stages_on_image(
         os.makedirs(output_dir)
         print(f"Created output directory: {output_dir}")
 
-    source_image = Image.open(image_path).convert("RGBA") # Use RGBA for transparency handling
-    img_w, img_h = source_image.size
+    source_rgba = Image.open(image_path).convert("RGBA") # Use RGBA for transparency handling
+    img_w, img_h = source_rgba.size
+    # Composite onto a white background once; every stage starts from a copy of this RGB image.
+    # The only translucent content, the column fills (stages 2 and 5), is blended with NumPy.
+    source_image = Image.new("RGB", source_rgba.size, "white")
+    source_image.paste(source_rgba, mask=source_rgba.split()[3])
+    del source_rgba
+
+    # Large pages are drawn at a reduced resolution; the boxes are scaled below to match
+    scale = min(1.0, max_dim / max(img_w, img_h)) if max_dim else 1.0
+    if scale < 1.0:
+        img_w, img_h = max(1, int(img_w * scale)), max(1, int(img_h * scale))
+        source_image = source_image.resize((img_w, img_h), Image.BILINEAR)
 
     # Determine font sizes relative to image height, with min sizes
     title_font_size = max(15, int(img_h * 0.03))
     label_font_size = max(12, int(title_font_size * 0.8))
     
-    resolved_font_path = base_font_path if base_font_path else "arial.ttf"
-    try:
-        title_font = ImageFont.truetype(resolved_font_path, title_font_size)
-    except IOError:
-        # print(f"Title font '{resolved_font_path}' not found, using default.")
-        try:
-            title_font = ImageFont.load_default(size=title_font_size)
-        except TypeError:
-            title_font = ImageFont.load_default()
-
-    initial_polygon_boxes = [item[0] for item in initial_ocr_results]
-
-    # --- Stage 1: Initial OCR Polygons ---
-    img_s1_rgba = source_image.copy() # Work on a copy
-    draw_boxes_on_image_direct(img_s1_rgba, initial_polygon_boxes, color='blue', labels=True, 
-                               font_path=base_font_path, label_font_size=label_font_size)
-    ImageDraw.Draw(img_s1_rgba).text((10,10), "Stage 1: Initial OCR Polygons", fill="black", font=title_font)
-    # Composite onto a white background if saving as JPG/PNG without transparency issues
-    img_s1_rgb = Image.new("RGB", img_s1_rgba.size, "white")
-    img_s1_rgb.paste(img_s1_rgba, mask=img_s1_rgba.split()[3] if img_s1_rgba.mode == "RGBA" else None)
-    s1_path = os.path.join(output_dir, "01_initial_polygons.png")
-    img_s1_rgb.save(s1_path); print(f"Saved: {s1_path}")
-
-    # --- Stage 2: Identified Columns ---
-    img_s2_rgba = source_image.copy()
-    draw_s2_text_overlay = ImageDraw.Draw(img_s2_rgba) # For drawing text labels on top of transparent fills
-    if identified_cols:
-        # Define a list of semi-transparent fill colors for columns
-        col_fills_rgba = [
-            (255, 0, 0, 40), (0, 255, 0, 40), (0, 0, 255, 40), 
-            (255, 255, 0, 40), (255, 0, 255, 40), (0, 255, 255, 40)
-        ]
-        for i, (cx1, cx2) in enumerate(identified_cols):
-            fill_color_rgba = col_fills_rgba[i % len(col_fills_rgba)]
-            outline_color_rgb = tuple(c // 2 for c in fill_color_rgba[:3]) # Darker outline
-
-            # Create a transparent layer for this column's fill
-            col_fill_layer = Image.new('RGBA', img_s2_rgba.size, (0,0,0,0)) # Fully transparent
-            draw_col_fill = ImageDraw.Draw(col_fill_layer)
-            draw_col_fill.rectangle([cx1, 0, cx2, img_h], fill=fill_color_rgba, outline=outline_color_rgb, width=1)
-            
-            # Alpha composite this layer onto the current stage image
-            img_s2_rgba = Image.alpha_composite(img_s2_rgba, col_fill_layer)
-            
-            # Draw column label text on the main image (after compositing fills)
+    # Fonts are loaded once (and cached across calls) and shared by all stages
+    title_font = _load_font(base_font_path, title_font_size)
+    label_font = _load_font(base_font_path, label_font_size)
+
+    if isinstance(initial_ocr_results, np.ndarray):
+        initial_polygon_boxes = initial_ocr_results # Drawn straight from the array
+    else:
+        initial_polygon_boxes = [item[0] for item in initial_ocr_results]
+    if scale < 1.0:
+        initial_polygon_boxes = _scale_boxes(initial_polygon_boxes, scale)
+        full_length_single_col_rows = _scale_boxes(full_length_single_col_rows, scale)
+        spanning_row_boxes = _scale_boxes(spanning_row_boxes, scale)
+        identified_cols = [(cx1 * scale, cx2 * scale) for cx1, cx2 in (identified_cols or [])]
+
+    # Faint gray column lines: (200, 200, 200) at alpha 100 over white
+    faint_line_color = (233, 233, 233)
+    # Semi-transparent fill colors for columns
+    col_fills_rgba = [
+        (255, 0, 0, 40), (0, 255, 0, 40), (0, 0, 255, 40), 
+        (255, 255, 0, 40), (255, 0, 255, 40), (0, 255, 255, 40)
+    ]
+
+    # All faint column lines as one zigzag path: the vertical segments run from just above
+    # to just below the page, so the connecting horizontal segments fall outside the image
+    faint_line_path = []
+    for cx1, cx2 in (identified_cols or []):
+        for x in (cx1, cx2):
+            faint_line_path += [(x, -1), (x, img_h)] if len(faint_line_path) % 4 == 0 else [(x, img_h), (x, -1)]
+
+    # Stage definitions: (title, file name, column fills, faint column lines, box layers).
+    # Column fills are None, 'outlined' or 'plain'; each box layer is (boxes, color, thickness).
+    stages = [
+        ("Stage 1: Initial OCR Polygons", "01_initial_polygons", None, False,
+         [(initial_polygon_boxes, 'blue', 2)]),
+        ("Stage 2: Identified Columns", "02_identified_columns", 'outlined', False, []),
+        ("Stage 3: Spanning Rows", "03_spanning_rows", None, True,
+         [(spanning_row_boxes, 'purple', 3)]),
+        ("Stage 4: Full-Column-Width Rows", "04_full_column_rows", None, True,
+         [(full_length_single_col_rows, 'red', 2)]),
+        # Column fills first, then spanning rows, then in-column rows (full width)
+        ("Stage 5: Combined Layout", "05_combined_layout", 'plain', False,
+         [(spanning_row_boxes, 'purple', 3), (full_length_single_col_rows, 'darkred', 2)]),
+    ]
+
+    def render_stage(stage):
+        """Draws one stage on its own buffer (a pooled copy of the source image) and saves it; returns the path."""
+        title, file_name, column_fills, faint_cols, box_layers = stage
+        stage_image = _acquire_buffer(source_image.size, source_image.mode)
+        stage_image.paste(source_image)
+        draw = ImageDraw.Draw(stage_image) # One drawing context for everything drawn on this stage
+
+        if identified_cols and column_fills:
+            # Column fills are blended straight into the RGB image; labels are drawn on top
+            _blend_column_fills(stage_image, identified_cols, col_fills_rgba,
+                                draw_outlines=(column_fills == 'outlined'))
             if title_font:
-                draw_s2_text_overlay.text((cx1 + 5, img_h * 0.05), f"Col {i+1}", fill="black", font=title_font)
-    
-    ImageDraw.Draw(img_s2_rgba).text((10,10), "Stage 2: Identified Columns", fill="black", font=title_font)
-    img_s2_rgb = Image.new("RGB", img_s2_rgba.size, "white")
-    img_s2_rgb.paste(img_s2_rgba, mask=img_s2_rgba.split()[3] if img_s2_rgba.mode == "RGBA" else None)
-    s2_path = os.path.join(output_dir, "02_identified_columns.png")
-    img_s2_rgb.save(s2_path); print(f"Saved: {s2_path}")
-    
-    # --- Stage 3: Spanning Rows ---
-    img_s3_rgba = source_image.copy()
-    if identified_cols: # Draw faint column lines for context
-        draw_faint_cols = ImageDraw.Draw(img_s3_rgba)
-        for cx1,cx2 in identified_cols:
-            draw_faint_cols.line([(cx1,0),(cx1,img_h)],fill=(200,200,200,100),width=1) # Faint gray lines
-            draw_faint_cols.line([(cx2,0),(cx2,img_h)],fill=(200,200,200,100),width=1)
-    draw_boxes_on_image_direct(img_s3_rgba, spanning_row_boxes, color='purple', thickness=3, labels=True,
-                               font_path=base_font_path, label_font_size=label_font_size)
-    ImageDraw.Draw(img_s3_rgba).text((10,10), "Stage 3: Spanning Rows", fill="black", font=title_font)
-    img_s3_rgb = Image.new("RGB", img_s3_rgba.size, "white")
-    img_s3_rgb.paste(img_s3_rgba, mask=img_s3_rgba.split()[3] if img_s3_rgba.mode == "RGBA" else None)
-    s3_path = os.path.join(output_dir, "03_spanning_rows.png")
-    img_s3_rgb.save(s3_path); print(f"Saved: {s3_path}")
-
-    # --- Stage 4: Full Column Width Rows (In-Column Rows) ---
-    img_s4_rgba = source_image.copy()
-    if identified_cols: # Draw faint column lines
-        draw_faint_cols_s4 = ImageDraw.Draw(img_s4_rgba)
-        for cx1,cx2 in identified_cols:
-            draw_faint_cols_s4.line([(cx1,0),(cx1,img_h)],fill=(200,200,200,100),width=1)
-            draw_faint_cols_s4.line([(cx2,0),(cx2,img_h)],fill=(200,200,200,100),width=1)
-    draw_boxes_on_image_direct(img_s4_rgba, full_length_single_col_rows, color='red', thickness=2, labels=True,
-                               font_path=base_font_path, label_font_size=label_font_size)
-    ImageDraw.Draw(img_s4_rgba).text((10,10), "Stage 4: Full-Column-Width Rows", fill="black", font=title_font)
-    img_s4_rgb = Image.new("RGB", img_s4_rgba.size, "white")
-    img_s4_rgb.paste(img_s4_rgba, mask=img_s4_rgba.split()[3] if img_s4_rgba.mode == "RGBA" else None)
-    s4_path = os.path.join(output_dir, "04_full_column_rows.png")
-    img_s4_rgb.save(s4_path); print(f"Saved: {s4_path}")
-
-    # --- Stage 5: Combined Final Layout ---
-    img_s5_rgba = source_image.copy()
-    draw_s5_text_overlay = ImageDraw.Draw(img_s5_rgba) # For column labels
-    if identified_cols: # Draw column fills first
-        for i,(cx1,cx2) in enumerate(identified_cols):
-            fill_color_rgba = col_fills_rgba[i % len(col_fills_rgba)]
-            col_fill_layer_s5 = Image.new('RGBA', img_s5_rgba.size, (0,0,0,0))
-            ImageDraw.Draw(col_fill_layer_s5).rectangle([cx1,0,cx2,img_h], fill=fill_color_rgba, outline=None) # No outline for fill
-            img_s5_rgba = Image.alpha_composite(img_s5_rgba, col_fill_layer_s5)
-            if title_font: # Draw column labels on top of fills
-                draw_s5_text_overlay.text((cx1+5, img_h * 0.05),f"Col {i+1}", fill="black", font=title_font)
-    
-    # Then draw spanning rows
-    draw_boxes_on_image_direct(img_s5_rgba, spanning_row_boxes, color='purple', thickness=3, labels=True,
-                               font_path=base_font_path, label_font_size=label_font_size)
-    # Then draw in-column rows (full width)
-    draw_boxes_on_image_direct(img_s5_rgba, full_length_single_col_rows, color='darkred', thickness=2, labels=True,
-                               font_path=base_font_path, label_font_size=label_font_size)
-    
-    ImageDraw.Draw(img_s5_rgba).text((10,10), "Stage 5: Combined Layout", fill="black", font=title_font)
-    img_s5_rgb = Image.new("RGB", img_s5_rgba.size, "white")
-    img_s5_rgb.paste(img_s5_rgba, mask=img_s5_rgba.split()[3] if img_s5_rgba.mode == "RGBA" else None)
-    s5_path = os.path.join(output_dir, "05_combined_layout.png")
-    img_s5_rgb.save(s5_path); print(f"Saved: {s5_path}")
\ No newline at end of file
+                for i, (cx1, _) in enumerate(identified_cols):
+                    draw.text((cx1 + 5, img_h * 0.05), f"Col {i+1}", fill="black", font=title_font)
+        if identified_cols and faint_cols: # Draw faint column lines for context
+            draw.line(faint_line_path, fill=faint_line_color, width=1) # Faint gray lines
+
+        for boxes, color, thickness in box_layers:
+            draw_boxes_on_image_direct(stage_image, boxes, color=color, thickness=thickness, labels=True,
+                                       label_font_size=label_font_size, font=label_font, draw=draw,
+                                       clip_size=(img_w, img_h))
+
+        # Paste the pre-rendered title instead of rasterizing it again
+        title_mask, (title_dx, title_dy) = _render_text_mask(title, title_font)
+        stage_image.paste((0, 0, 0), (10 + title_dx, 10 + title_dy), title_mask)
+        stage_path = _save_stage_image(stage_image, output_dir, file_name, output_format, png_compress_level)
+        _release_buffer(stage_image)
+        return stage_path
+
+    # The stages are independent and only read the shared source image. ImageDraw holds the GIL,
+    # but Pillow releases it while pasting and encoding, so the threads overlap those steps
+    # (one stage is saved while another is drawn); the drawing itself does not run in parallel.
+    with ThreadPoolExecutor(max_workers=max_workers or len(stages)) as executor:
+        for stage_path in executor.map(render_stage, stages):
+            print(f"Saved: {stage_path}")